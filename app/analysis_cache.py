@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+
+# Persists the market data dependent part of an analysis, i.e. the historical data, the efficient frontier, the simulation
+# summary and the rendered pages, as one pickle per key. Memory-mapped returns live in a directory of their entry and are only
+# referenced by the pickle. Entries are evicted least recently used first once the directory exceeds its size limit.
+class AnalysisCache:
+
+    def __init__(self, cache_directory: str, max_size_mb: float = 512):
+        self.cache_directory: str = cache_directory
+        self.max_size_mb: float = max_size_mb
+        os.makedirs(cache_directory, exist_ok=True)
+
+    @staticmethod
+    def create_key(key_parts: dict) -> str:
+        return hashlib.sha256(json.dumps(key_parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_directory, f"{key}.pickle")
+
+    def get_storage_directory(self, key: str) -> str:
+        return os.path.join(self.cache_directory, f"{key}.returns")
+
+    def load(self, key: str) -> dict:
+        path: str = self.get_path(key)
+        try:
+            with open(path, "rb") as file:
+                entry: dict = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        # The modification time is the recency of the entry for the eviction.
+        os.utime(path)
+        return entry
+
+    def save(self, key: str, entry: dict):
+        path: str = self.get_path(key)
+        temporary_path: str = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self.evict(keep_path=path)
+
+    def evict(self, keep_path: str = None):
+        paths: [str] = [os.path.join(self.cache_directory, name) for name in os.listdir(self.cache_directory) if name.endswith(".pickle")]
+        path_to_stat: {str, os.stat_result} = {path: os.stat(path) for path in paths}
+        path_to_size: {str, int} = {path: stat.st_size + self.get_directory_size(self.get_storage_directory(os.path.basename(path)[:-7]))
+                                    for path, stat in path_to_stat.items()}
+        size: int = sum(path_to_size.values())
+        for path in sorted(paths, key=lambda p: path_to_stat[p].st_mtime):
+            if size <= self.max_size_mb * 1024 * 1024:
+                break
+            if path == keep_path:
+                continue
+            os.remove(path)
+            shutil.rmtree(self.get_storage_directory(os.path.basename(path)[:-7]), ignore_errors=True)
+            size -= path_to_size[path]
+
+    @staticmethod
+    def get_directory_size(directory: str) -> int:
+        if not os.path.isdir(directory):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
@@ -0,0 +1,241 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from data_source.market_data_source import MarketDataSource
+from efficient_frontier import EfficientFrontier
+from historical_data import HistoricalData
+from model.portfolio_result import PortfolioResult
+from portfolio_analyser import PortfolioAnalyser
+from portfolio_result_exporter import PortfolioResultExporter
+from risk_engine import RiskEngine
+from risk_model.covariance_estimator import CovarianceEstimator
+from utils.utils import Utils
+
+
+# The analysis of one set of symbols kept warm between requests. The frontier, the solver caches and the selections that do
+# not depend on the quantities are computed once, a request only prices its positions and solves its current std portfolio.
+# The solver caches are not thread safe, so that solve holds the lock while requests on other symbols run concurrently.
+class WarmAnalysis:
+
+    def __init__(self, portfolio_analyser: PortfolioAnalyser):
+        self.portfolio_analyser: PortfolioAnalyser = portfolio_analyser
+        self.lock: threading.Lock = threading.Lock()
+        self.efficient_frontier: EfficientFrontier = portfolio_analyser.optimization_portfolio_result()
+        self.label_to_optimal_result: {str, PortfolioResult} = {
+            "Opt: Min Std": self.efficient_frontier.get_min_std(),
+            "Opt: Max Return": self.efficient_frontier.get_max_return(),
+            "Opt: Max Sharpe Ratio": self.efficient_frontier.get_max_sharpe_ratio(),
+        }
+        self.risk_engine: RiskEngine = RiskEngine(portfolio_analyser.historical_data.returns, portfolio_analyser.confidence_level,
+                                                  portfolio_analyser.stress_scenarios)
+        self.exporter: PortfolioResultExporter = PortfolioResultExporter(portfolio_analyser.historical_data.symbols,
+                                                                         portfolio_analyser.risk_free_return)
+
+    def analyse(self, quantities: Series) -> dict:
+        current_portfolio_result: PortfolioResult = self.portfolio_analyser.create_portfolio_result(
+            self.portfolio_analyser.create_portfolio(quantities))
+        with self.lock:
+            current_std_max_return: PortfolioResult = self.efficient_frontier.get_max_return_same_std(
+                current_portfolio_result.annualized_standard_deviation)
+        label_to_portfolio_result: {str, PortfolioResult} = {
+            "Current": current_portfolio_result,
+            "Opt: Min Std": self.label_to_optimal_result["Opt: Min Std"],
+            "Opt: Max Return": self.label_to_optimal_result["Opt: Max Return"],
+            "Opt: Current Std Max Return": current_std_max_return,
+            "Opt: Max Sharpe Ratio": self.label_to_optimal_result["Opt: Max Sharpe Ratio"],
+        }
+        risk_metrics: DataFrame = self.risk_engine.calculate(np.vstack([result.weights for result in label_to_portfolio_result.values()]))
+        return {
+            "symbols": self.exporter.symbols_in_correct_order,
+            "risk_free_return": self.exporter.risk_free_return,
+            "value": current_portfolio_result.portfolio_value,
+            "portfolios": {label: self.exporter.create_portfolio_dict(result.annualized_expected_returns,
+                                                                      result.annualized_standard_deviation, result.weights, risk)
+                           for (label, result), risk in zip(label_to_portfolio_result.items(), risk_metrics.to_dict(orient="records"))},
+        }
+
+
+# Serves analyses of positions over a universe of symbols whose historical data is loaded once and refreshed on a schedule.
+# Warm analyses are kept per set of requested symbols, least recently used first out, and are dropped with every refresh.
+class AnalysisServer:
+
+    def __init__(self, symbols: [str], historical_years: int, data_source: MarketDataSource = None, use_adjusted_close: bool = False,
+                 estimator: CovarianceEstimator = None, analyser_options: dict = None, nr_of_workers: int = 4,
+                 refresh_interval_seconds: float = None, max_warm_analyses: int = 64):
+        self.symbols: [str] = symbols
+        self.historical_years: int = historical_years
+        self.data_source: MarketDataSource = data_source
+        self.use_adjusted_close: bool = use_adjusted_close
+        self.estimator: CovarianceEstimator = estimator
+        self.analyser_options: dict = analyser_options if analyser_options is not None else {}
+        self.nr_of_workers: int = nr_of_workers
+        self.refresh_interval_seconds: float = refresh_interval_seconds
+        self.max_warm_analyses: int = max_warm_analyses
+        self.state_lock: threading.Lock = threading.Lock()
+        self.refresh_lock: threading.Lock = threading.Lock()
+        self.stop_event: threading.Event = threading.Event()
+        self.nr_of_requests: int = 0
+        self.refresh()
+
+    # The new data is loaded while requests are still served from the previous data, then both are swapped at once.
+    def refresh(self):
+        with self.refresh_lock:
+            start_date: str = Utils.get_date_string_today_n_years_back(self.historical_years)
+            end_date: str = Utils.get_date_string_yesterday()
+            historical_data: HistoricalData = HistoricalData(symbols=self.symbols, start_date=start_date, end_date=end_date,
+                                                             data_source=self.data_source, use_adjusted_close=self.use_adjusted_close,
+                                                             estimator=self.estimator)
+            with self.state_lock:
+                self.historical_data: HistoricalData = historical_data
+                self.start_date: str = start_date
+                self.end_date: str = end_date
+                self.refreshed_at: float = time.time()
+                self.symbols_to_warm_analysis: OrderedDict = OrderedDict()
+
+    def refresh_periodically(self):
+        while not self.stop_event.wait(self.refresh_interval_seconds):
+            try:
+                self.refresh()
+            except Exception as error:
+                print(f"Refreshing market data failed, serving the previous data: {error}")
+
+    def get_status(self) -> dict:
+        with self.state_lock:
+            return {
+                "status": "ok",
+                "symbols": self.historical_data.symbols,
+                "start_date": self.start_date,
+                "end_date": self.end_date,
+                "refreshed_at": pd.Timestamp(self.refreshed_at, unit="s").isoformat(),
+                "warm_analyses": len(self.symbols_to_warm_analysis),
+                "requests": self.nr_of_requests,
+            }
+
+    def analyse(self, quantities: Series) -> dict:
+        with self.state_lock:
+            self.nr_of_requests += 1
+            historical_data: HistoricalData = self.historical_data
+        served_symbols: {str} = set(historical_data.symbols)
+        unknown_symbols: [str] = [symbol for symbol in quantities.index if symbol not in served_symbols]
+        if unknown_symbols:
+            raise ValueError(f"Symbols outside the served universe: {', '.join(unknown_symbols)}")
+        if not np.isfinite(quantities.to_numpy()).all() or len(quantities) == 0:
+            raise ValueError("Positions need a finite quantity per symbol")
+        # In universe order, so the same symbols share one warm analysis whatever the order of the payload.
+        quantities = quantities.reindex([symbol for symbol in historical_data.symbols if symbol in quantities.index])
+        if (quantities * historical_data.get_latest_closing_prices(quantities.index.tolist())).sum() <= 0:
+            raise ValueError("Positions need a positive value")
+        return self.get_warm_analysis(historical_data, quantities).analyse(quantities)
+
+    def get_warm_analysis(self, historical_data: HistoricalData, quantities: Series) -> WarmAnalysis:
+        key: tuple = tuple(quantities.index)
+        with self.state_lock:
+            warm_analysis: WarmAnalysis = self.symbols_to_warm_analysis.get(key)
+            if warm_analysis is not None:
+                self.symbols_to_warm_analysis.move_to_end(key)
+                return warm_analysis
+        warm_analysis = WarmAnalysis(PortfolioAnalyser(self.historical_years, None, quantities=quantities, historical_data=historical_data,
+                                                       **self.analyser_options))
+        with self.state_lock:
+            # An analysis of data replaced by a refresh in the meantime serves this request only.
+            if historical_data is not self.historical_data:
+                return warm_analysis
+            warm_analysis = self.symbols_to_warm_analysis.setdefault(key, warm_analysis)
+            while len(self.symbols_to_warm_analysis) > self.max_warm_analyses:
+                self.symbols_to_warm_analysis.popitem(last=False)
+        return warm_analysis
+
+    # Positions as {"positions": {"AAPL": 10, ...}} or {"positions": [{"symbol": "AAPL", "quantity": 10}, ...]}, a symbol listed
+    # several times has its quantities summed like in a positions csv.
+    @staticmethod
+    def parse_quantities(payload: dict) -> Series:
+        positions = payload["positions"]
+        if isinstance(positions, dict):
+            positions = [{"symbol": symbol, "quantity": quantity} for symbol, quantity in positions.items()]
+        symbols: [str] = [str(position["symbol"]).strip() for position in positions]
+        quantities: Series = Series([float(position["quantity"]) for position in positions], index=symbols, dtype=np.float64)
+        return quantities.groupby(level=0, sort=False).sum()
+
+    def create_http_server(self, host: str = "127.0.0.1", port: int = 8050) -> 'WorkerPoolHTTPServer':
+        http_server: WorkerPoolHTTPServer = WorkerPoolHTTPServer((host, port), AnalysisRequestHandler, self.nr_of_workers)
+        http_server.analysis_server = self
+        return http_server
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8050):
+        http_server: WorkerPoolHTTPServer = self.create_http_server(host, port)
+        if self.refresh_interval_seconds:
+            threading.Thread(target=self.refresh_periodically, daemon=True).start()
+        print(f"Serving analyses on http://{host}:{http_server.server_port}")
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            http_server.server_close()
+
+
+# Hands every connection to a fixed pool of worker threads instead of one new thread per request.
+class WorkerPoolHTTPServer(HTTPServer):
+    request_queue_size: int = 128
+
+    def __init__(self, server_address: (str, int), request_handler_class, nr_of_workers: int):
+        super().__init__(server_address, request_handler_class)
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=nr_of_workers, thread_name_prefix="analysis")
+        self.analysis_server: AnalysisServer = None
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_in_worker, request, client_address)
+
+    def process_request_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, self.server.analysis_server.get_status())
+        else:
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        analysis_server: AnalysisServer = self.server.analysis_server
+        try:
+            if self.path == "/analyse":
+                payload: dict = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                self.send_json(200, analysis_server.analyse(analysis_server.parse_quantities(payload)))
+            elif self.path == "/refresh":
+                analysis_server.refresh()
+                self.send_json(200, analysis_server.get_status())
+            else:
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+        except (ValueError, KeyError, TypeError) as error:
+            self.send_json(400, {"error": str(error)})
+        except Exception as error:
+            self.send_json(500, {"error": str(error)})
+
+    def send_json(self, status: int, body: dict):
+        content: bytes = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from data_source.market_data_source import MarketDataSource
+from historical_data import HistoricalData
+from portfolio_analyser import PortfolioAnalyser
+from risk_model.covariance_estimator import CovarianceEstimator
+from utils.utils import Utils
+
+# Set once per worker process by the pool initializer so the shared historical data is not pickled for every portfolio.
+worker_batch_portfolio_analyser = None
+
+
+class BatchPortfolioAnalyser:
+
+    def __init__(self, historical_years: int, positions_file_paths: [str], data_source: MarketDataSource = None,
+                 use_adjusted_close: bool = False, nr_of_workers: int = 1, analyser_options: dict = None, returns_storage: str = "memory",
+                 returns_storage_directory: str = None, estimator: CovarianceEstimator = None):
+        self.historical_years: int = historical_years
+        self.positions_file_paths: [str] = positions_file_paths
+        self.nr_of_workers: int = nr_of_workers
+        self.analyser_options: dict = analyser_options if analyser_options is not None else {}
+        symbols: [str] = sorted({symbol for positions_file_path in positions_file_paths
+                                 for symbol in PortfolioAnalyser.get_symbols_from_csv(positions_file_path)})
+        self.historical_data: HistoricalData = HistoricalData(
+            symbols=symbols,
+            start_date=Utils.get_date_string_today_n_years_back(historical_years),
+            end_date=Utils.get_date_string_yesterday(),
+            data_source=data_source,
+            use_adjusted_close=use_adjusted_close,
+            returns_storage=returns_storage,
+            storage_directory=returns_storage_directory,
+            estimator=estimator,
+        )
+
+    @staticmethod
+    def get_positions_file_paths(positions: str) -> [str]:
+        if os.path.isdir(positions):
+            return sorted(str(path) for path in Path(positions).glob("*.csv"))
+        with open(positions) as file:
+            manifest_directory: str = os.path.dirname(positions)
+            return [os.path.join(manifest_directory, line.strip()) for line in file if line.strip() and not line.startswith("#")]
+
+    def create_analysis_reports(self, report_output_directory: str, report_name_suffix: str, output_format: str = "pdf") -> [str]:
+        os.makedirs(report_output_directory, exist_ok=True)
+        report_output_paths: [str] = [os.path.join(report_output_directory, f"{Path(positions_file_path).stem}_{report_name_suffix}.{output_format}")
+                                      for positions_file_path in self.positions_file_paths]
+        if self.nr_of_workers > 1 and len(self.positions_file_paths) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.nr_of_workers, len(self.positions_file_paths)),
+                                     initializer=set_worker_batch_portfolio_analyser, initargs=(self,)) as executor:
+                list(executor.map(create_analysis_report_in_worker, self.positions_file_paths, report_output_paths,
+                                  [output_format] * len(report_output_paths)))
+        else:
+            for positions_file_path, report_output_path in zip(self.positions_file_paths, report_output_paths):
+                self.create_analysis_report(positions_file_path, report_output_path, output_format)
+        return report_output_paths
+
+    def create_analysis_report(self, positions_file_path: str, report_output_path: str, output_format: str = "pdf"):
+        print(f"Analysing {positions_file_path}...")
+        portfolio_analyser: PortfolioAnalyser = PortfolioAnalyser(historical_years=self.historical_years,
+                                                                  positions_file_path=positions_file_path,
+                                                                  historical_data=self.historical_data,
+                                                                  **self.analyser_options)
+        portfolio_analyser.create_analysis_report(report_output_path, output_format)
+
+
+def set_worker_batch_portfolio_analyser(batch_portfolio_analyser: BatchPortfolioAnalyser):
+    global worker_batch_portfolio_analyser
+    worker_batch_portfolio_analyser = batch_portfolio_analyser
+
+
+def create_analysis_report_in_worker(positions_file_path: str, report_output_path: str, output_format: str):
+    worker_batch_portfolio_analyser.create_analysis_report(positions_file_path, report_output_path, output_format)
@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from data_source.market_data_source import MarketDataSource
+
+
+# Stores prices and dividends per symbol as memory-mapped .npy files together with the date range they cover. Later runs
+# only fetch the days that are missing from the cached range from the wrapped data source. A symbol whose data source
+# fingerprint changed, e.g. another data directory or an edited price file, is fetched again in full.
+class CachedMarketDataSource(MarketDataSource):
+
+    def __init__(self, data_source: MarketDataSource, cache_directory: str):
+        self.data_source: MarketDataSource = data_source
+        self.cache_directory: str = cache_directory
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self.updated_request: (tuple, str, str) = None
+        os.makedirs(cache_directory, exist_ok=True)
+
+    def get_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        self.update_cache(symbols, start_date, end_date)
+        return pd.concat({symbol: self.read_series(symbol, "close", start_date, end_date) for symbol in symbols}, axis=1)
+
+    def get_adjusted_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        # Adjusted closes are restated back in time on every new dividend, so they cannot be extended incrementally.
+        return self.data_source.get_adjusted_closing_prices(symbols, start_date, end_date)
+
+    def get_dividends(self, symbols: [str], start_date: str, end_date: str) -> {str, Series}:
+        self.update_cache(symbols, start_date, end_date)
+        return {symbol: self.read_series(symbol, "dividends", start_date, end_date) for symbol in symbols}
+
+    # The cache serves the prices of the wrapped data source.
+    def get_fingerprint(self, symbol: str) -> dict:
+        return self.data_source.get_fingerprint(symbol)
+
+    # The closing prices and dividends of a load ask for the same symbols and range, the cache is updated and counted once for both.
+    def update_cache(self, symbols: [str], start_date: str, end_date: str):
+        if self.updated_request == (tuple(symbols), start_date, end_date):
+            return
+        self.updated_request = (tuple(symbols), start_date, end_date)
+        fetch_range_to_symbols: {(str, str, bool), [str]} = {}
+        symbol_to_fingerprint: {str, dict} = {symbol: self.data_source.get_fingerprint(symbol) for symbol in symbols}
+        for symbol in symbols:
+            cached_range: {} = self.read_cached_range(symbol)
+            if cached_range is None or cached_range["start_date"] > start_date or cached_range.get("fingerprint") != symbol_to_fingerprint[symbol]:
+                fetch_range_to_symbols.setdefault((start_date, end_date, True), []).append(symbol)
+            elif cached_range["end_date"] < end_date:
+                fetch_range_to_symbols.setdefault((cached_range["end_date"], end_date, False), []).append(symbol)
+            else:
+                self.cache_hits += 1
+
+        for (fetch_start_date, fetch_end_date, is_full_fetch), fetch_symbols in fetch_range_to_symbols.items():
+            self.cache_misses += len(fetch_symbols)
+            closing_prices: DataFrame = self.data_source.get_closing_prices(fetch_symbols, fetch_start_date, fetch_end_date)
+            symbol_to_dividends: {str, Series} = self.data_source.get_dividends(fetch_symbols, fetch_start_date, fetch_end_date)
+            for symbol in fetch_symbols:
+                cached_range: {} = self.read_cached_range(symbol)
+                close: Series = closing_prices[symbol].dropna() if symbol in closing_prices else self.create_empty_series()
+                dividends: Series = symbol_to_dividends.get(symbol, self.create_empty_series())
+                if not is_full_fetch:
+                    close = self.merge_series(self.read_series(symbol, "close"), close)
+                    dividends = self.merge_series(self.read_series(symbol, "dividends"), dividends)
+                self.write_series(symbol, "close", close)
+                self.write_series(symbol, "dividends", dividends)
+                self.write_cached_range(symbol, fetch_start_date if is_full_fetch else cached_range["start_date"], fetch_end_date,
+                                        symbol_to_fingerprint[symbol])
+
+    def get_path(self, symbol: str, name: str) -> str:
+        return os.path.join(self.cache_directory, f"{symbol}.{name}")
+
+    def read_cached_range(self, symbol: str) -> {}:
+        path: str = self.get_path(symbol, "json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            return json.load(file)
+
+    def write_cached_range(self, symbol: str, start_date: str, end_date: str, fingerprint: dict):
+        self.write_atomic(self.get_path(symbol, "json"), lambda file: file.write(json.dumps({"start_date": start_date, "end_date": end_date,
+                                                                                            "fingerprint": fingerprint}).encode()))
+
+    def read_series(self, symbol: str, name: str, start_date: str = None, end_date: str = None) -> Series:
+        dates: np.array = np.load(self.get_path(symbol, f"{name}.dates.npy"), mmap_mode="r")
+        values: np.array = np.load(self.get_path(symbol, f"{name}.values.npy"), mmap_mode="r")
+        start: int = 0 if start_date is None else np.searchsorted(dates, np.datetime64(start_date, "ns"), side="left")
+        end: int = len(dates) if end_date is None else np.searchsorted(dates, np.datetime64(end_date, "ns"), side="left")
+        return Series(np.array(values[start:end]), index=pd.DatetimeIndex(np.array(dates[start:end])), name=symbol)
+
+    def write_series(self, symbol: str, name: str, series: Series):
+        series = series.sort_index()
+        self.write_atomic(self.get_path(symbol, f"{name}.dates.npy"),
+                          lambda file: np.save(file, series.index.to_numpy(dtype="datetime64[ns]")))
+        self.write_atomic(self.get_path(symbol, f"{name}.values.npy"),
+                          lambda file: np.save(file, series.to_numpy(dtype=np.float64)))
+
+    @staticmethod
+    def create_empty_series() -> Series:
+        return Series(dtype=np.float64, index=pd.DatetimeIndex([]))
+
+    @staticmethod
+    def merge_series(cached: Series, fetched: Series) -> Series:
+        merged: Series = pd.concat([cached, fetched])
+        return merged[~merged.index.duplicated(keep="last")]
+
+    @staticmethod
+    def write_atomic(path: str, write):
+        temporary_path: str = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            write(file)
+        os.replace(temporary_path, path)
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+from pandas import DataFrame, Series
+
+from data_source.market_data_source import MarketDataSource
+
+
+# Reads one <SYMBOL>.csv file per symbol with the header Date,Close,Dividends and an optional Adj Close column.
+class LocalFileMarketDataSource(MarketDataSource):
+
+    def __init__(self, data_directory: str):
+        self.data_directory: str = data_directory
+
+    def get_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        return pd.concat({symbol: self.read_symbol(symbol, start_date, end_date)["Close"] for symbol in symbols}, axis=1)
+
+    def get_adjusted_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        return pd.concat({symbol: self.read_symbol(symbol, start_date, end_date)["Adj Close"] for symbol in symbols}, axis=1)
+
+    def get_dividends(self, symbols: [str], start_date: str, end_date: str) -> {str, Series}:
+        symbol_to_dividends: {str, Series} = {}
+        for symbol in symbols:
+            dividends: Series = self.read_symbol(symbol, start_date, end_date)["Dividends"]
+            symbol_to_dividends[symbol] = dividends[dividends != 0]
+        return symbol_to_dividends
+
+    def get_fingerprint(self, symbol: str) -> dict:
+        path: str = os.path.join(self.data_directory, f"{symbol}.csv")
+        stat: os.stat_result = os.stat(path) if os.path.exists(path) else None
+        return {"type": type(self).__name__, "path": os.path.abspath(path), "size": stat.st_size if stat else None,
+                "modified_ns": stat.st_mtime_ns if stat else None}
+
+    def read_symbol(self, symbol: str, start_date: str, end_date: str) -> DataFrame:
+        df = pd.read_csv(os.path.join(self.data_directory, f"{symbol}.csv"), index_col="Date", parse_dates=True)
+        if "Dividends" not in df.columns:
+            df["Dividends"] = 0.0
+        return df[(df.index >= pd.Timestamp(start_date)) & (df.index < pd.Timestamp(end_date))]
@@ -0,0 +1,22 @@
+from abc import ABC, abstractmethod
+
+from pandas import DataFrame, Series
+
+
+class MarketDataSource(ABC):
+
+    @abstractmethod
+    def get_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        pass
+
+    @abstractmethod
+    def get_adjusted_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        pass
+
+    @abstractmethod
+    def get_dividends(self, symbols: [str], start_date: str, end_date: str) -> {str, Series}:
+        pass
+
+    # Identifies where the prices of a symbol come from, so results computed from other prices are never reused.
+    def get_fingerprint(self, symbol: str) -> dict:
+        return {"type": type(self).__name__}
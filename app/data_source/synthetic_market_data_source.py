@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from data_source.market_data_source import MarketDataSource
+
+
+# Offline prices from a factor model, r = B f + e, so the returns are correlated, with a quarterly dividend on every symbol.
+# The same seed, symbols and dates always give the same data.
+class SyntheticMarketDataSource(MarketDataSource):
+
+    def __init__(self, seed: int = 0, nr_of_factors: int = 5, dividend_interval_days: int = 63, dividend_yield: float = 0.005):
+        self.seed: int = seed
+        self.nr_of_factors: int = nr_of_factors
+        self.dividend_interval_days: int = dividend_interval_days
+        self.dividend_yield: float = dividend_yield
+        self.request_to_market_data: {(), (DataFrame, DataFrame, DataFrame)} = {}
+
+    def get_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        return self.generate(symbols, start_date, end_date)[0]
+
+    def get_adjusted_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        return self.generate(symbols, start_date, end_date)[1]
+
+    def get_dividends(self, symbols: [str], start_date: str, end_date: str) -> {str, Series}:
+        dividends: DataFrame = self.generate(symbols, start_date, end_date)[2]
+        return {symbol: dividends[symbol][dividends[symbol] != 0] for symbol in symbols}
+
+    def get_fingerprint(self, symbol: str) -> dict:
+        return {"type": type(self).__name__, "seed": self.seed, "nr_of_factors": self.nr_of_factors,
+                "dividend_interval_days": self.dividend_interval_days, "dividend_yield": self.dividend_yield}
+
+    def generate(self, symbols: [str], start_date: str, end_date: str) -> (DataFrame, DataFrame, DataFrame):
+        request: () = (tuple(symbols), start_date, end_date)
+        if request not in self.request_to_market_data:
+            self.request_to_market_data[request] = self.create_market_data(symbols, start_date, end_date)
+        return self.request_to_market_data[request]
+
+    def create_market_data(self, symbols: [str], start_date: str, end_date: str) -> (DataFrame, DataFrame, DataFrame):
+        generator: np.random.Generator = np.random.default_rng(self.seed)
+        dates: pd.DatetimeIndex = pd.bdate_range(start_date, end_date, inclusive="left", name="Date")
+        nr_of_days, nr_of_symbols = len(dates), len(symbols)
+        factor_loadings: np.array = generator.normal(0.6, 0.3, (nr_of_symbols, self.nr_of_factors)) / np.sqrt(self.nr_of_factors)
+        factor_returns: np.array = generator.normal(0.0, 0.01, (nr_of_days, self.nr_of_factors))
+        idiosyncratic_returns: np.array = generator.normal(0.0, 1.0, (nr_of_days, nr_of_symbols)) * generator.uniform(0.005, 0.02, nr_of_symbols)
+        drifts: np.array = generator.uniform(0.0, 0.0008, nr_of_symbols)
+        total_returns: np.array = drifts + factor_returns.dot(factor_loadings.T) + idiosyncratic_returns
+
+        adjusted_closing_prices: np.array = generator.uniform(20, 200, nr_of_symbols) * np.cumprod(1 + total_returns, axis=0)
+        dividend_days: np.array = np.zeros(nr_of_days, dtype=bool)
+        dividend_days[self.dividend_interval_days::self.dividend_interval_days] = True
+        # Closing prices drop by the dividend on the ex-date, so they grow slower than the total return of the adjusted prices.
+        dividend_returns: np.array = np.where(dividend_days[:, None], self.dividend_yield, 0.0)
+        closing_prices: np.array = adjusted_closing_prices / np.cumprod(1 + dividend_returns, axis=0)
+        dividends: np.array = np.where(dividend_days[:, None], closing_prices * self.dividend_yield, 0.0)
+        return (DataFrame(closing_prices, index=dates, columns=symbols),
+                DataFrame(adjusted_closing_prices, index=dates, columns=symbols),
+                DataFrame(dividends, index=dates, columns=symbols))
@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+import yfinance as yf
+from pandas import DataFrame, Series
+from requests.adapters import HTTPAdapter
+
+from data_source.market_data_source import MarketDataSource
+
+
+class YahooMarketDataSource(MarketDataSource):
+    retry_status_codes: {int} = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url: str = "https://query1.finance.yahoo.com", max_concurrent_requests: int = 8, max_retries: int = 3,
+                 backoff_seconds: float = 0.5, timeout_seconds: float = 10):
+        self.base_url: str = base_url.rstrip("/")
+        self.max_concurrent_requests: int = max_concurrent_requests
+        self.max_retries: int = max_retries
+        self.backoff_seconds: float = backoff_seconds
+        self.timeout_seconds: float = timeout_seconds
+        # One session for all symbols, its connection pool is sized to the concurrency cap so connections are reused.
+        self.session: requests.Session = requests.Session()
+        self.session.headers["User-Agent"] = "Mozilla/5.0"
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent_requests)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        return self.download_closing_prices(symbols, start_date, end_date, auto_adjust=False)
+
+    def get_adjusted_closing_prices(self, symbols: [str], start_date: str, end_date: str) -> DataFrame:
+        return self.download_closing_prices(symbols, start_date, end_date, auto_adjust=True)
+
+    def download_closing_prices(self, symbols: [str], start_date: str, end_date: str, auto_adjust: bool) -> DataFrame:
+        closing_prices = yf.download(symbols, start=start_date, end=end_date, auto_adjust=auto_adjust)["Close"]
+        if isinstance(closing_prices, Series):
+            closing_prices = closing_prices.to_frame(symbols[0])
+        return closing_prices
+
+    def get_fingerprint(self, symbol: str) -> dict:
+        return {"type": type(self).__name__, "base_url": self.base_url}
+
+    # Every symbol is one request to the chart endpoint, at most max_concurrent_requests of them are in flight at a time.
+    def get_dividends(self, symbols: [str], start_date: str, end_date: str) -> {str, Series}:
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrent_requests, len(symbols)))) as executor:
+            dividends: [Series] = list(executor.map(lambda symbol: self.fetch_dividends(symbol, start_date, end_date), symbols))
+        return dict(zip(symbols, dividends))
+
+    def fetch_dividends(self, symbol: str, start_date: str, end_date: str) -> Series:
+        params: {str, str} = {
+            "period1": str(int(pd.Timestamp(start_date, tz="UTC").timestamp())),
+            "period2": str(int(pd.Timestamp(end_date, tz="UTC").timestamp())),
+            "interval": "1d",
+            "events": "div",
+        }
+        response: requests.Response = self.get_with_retries(f"{self.base_url}/v8/finance/chart/{symbol}", params)
+        if response.status_code == 404:
+            return self.create_dividends(symbol, [], [])
+        response.raise_for_status()
+        result: dict = (response.json().get("chart", {}).get("result") or [{}])[0]
+        events: [dict] = list(result.get("events", {}).get("dividends", {}).values())
+        # Ex-dividend timestamps are at the market open, the dates in the exchange time zone match the closing price dates.
+        dates: pd.DatetimeIndex = pd.to_datetime([event["date"] for event in events], unit="s", utc=True) \
+            .tz_convert(result.get("meta", {}).get("exchangeTimezoneName", "UTC")).tz_localize(None).normalize()
+        dividends: Series = self.create_dividends(symbol, dates, [event["amount"] for event in events]).sort_index()
+        return dividends[(dividends.index >= pd.Timestamp(start_date)) & (dividends.index < pd.Timestamp(end_date))]
+
+    def get_with_retries(self, url: str, params: {str, str}) -> requests.Response:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response: requests.Response = self.session.get(url, params=params, timeout=self.timeout_seconds)
+                if response.status_code not in self.retry_status_codes or attempt == self.max_retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            time.sleep(self.backoff_seconds * 2 ** attempt)
+
+    @staticmethod
+    def create_dividends(symbol: str, dates, amounts: [float]) -> Series:
+        return Series(amounts, index=pd.DatetimeIndex(dates), name=symbol, dtype="float64")
@@ -0,0 +1,97 @@
+import numpy as np
+
+from efficient_frontier_solver import EfficientFrontierSolver
+from model.portfolio_result import PortfolioResult
+from model.portfolio_result_set import PortfolioResultSet
+
+
+# The solved frontier points together with exact selections. The min std, max sharpe ratio and target std portfolios are
+# bracketed by the solved points and refined by golden section search or bisection over the target return, each step being
+# a warm-started solve. Between solved points the weights are interpolated linearly, which is exact within one active set.
+class EfficientFrontier(PortfolioResultSet):
+    golden_ratio: float = (np.sqrt(5) - 1) / 2
+
+    def __init__(self, frontier_solver: EfficientFrontierSolver, nr_of_points: int, symbols_in_correct_order: [str],
+                 risk_free_return: float, tolerance: float = 1e-9):
+        self.frontier_solver: EfficientFrontierSolver = frontier_solver
+        self.tolerance: float = tolerance
+        self.target_returns: np.array = frontier_solver.get_expected_returns(nr_of_points)
+        weights: np.array = frontier_solver.solve(nr_of_points)
+        weights = weights / weights.sum(axis=1, keepdims=True)
+        expected_returns, corr_adj_variances = self.calculate_annualized_statistics(weights, frontier_solver.mean_returns,
+                                                                                    frontier_solver.H)
+        super().__init__(weights, expected_returns, corr_adj_variances, symbols_in_correct_order, frontier_solver.mean_returns,
+                         frontier_solver.H, risk_free_return)
+
+    def interpolate_weights(self, target_return: float) -> np.array:
+        index: int = int(np.clip(np.searchsorted(self.target_returns, target_return), 1, len(self.target_returns) - 1))
+        lower_return, upper_return = self.target_returns[index - 1], self.target_returns[index]
+        t: float = float(np.clip((target_return - lower_return) / max(upper_return - lower_return, np.finfo(float).tiny), 0, 1))
+        return (1 - t) * self.weights[index - 1] + t * self.weights[index]
+
+    def solve_weights(self, target_return: float) -> np.array:
+        x0: np.array = self.interpolate_weights(target_return)
+        result = self.frontier_solver.solver.solve_frontier_point(self.risk_model, self.mean_returns, target_return, x0)
+        weights: np.array = result["x"] if result.success else x0
+        return weights / weights.sum()
+
+    def calculate_standard_deviation(self, weights: np.array) -> float:
+        return float(np.sqrt(self.calculate_annualized_statistics(weights, self.mean_returns, self.risk_model)[1]))
+
+    def calculate_sharpe_ratio(self, weights: np.array) -> float:
+        expected_return, corr_adj_variance = self.calculate_annualized_statistics(weights, self.mean_returns, self.risk_model)
+        return float((expected_return - self.risk_free_return) / np.sqrt(corr_adj_variance))
+
+    def get_bracket(self, index: int) -> (float, float):
+        return self.target_returns[max(index - 1, 0)], self.target_returns[min(index + 1, len(self.target_returns) - 1)]
+
+    def maximize(self, score, index: int) -> np.array:
+        lower, upper = self.get_bracket(index)
+        best_weights: np.array = self.weights[index]
+        best_score: float = score(best_weights)
+        left, right = upper - self.golden_ratio * (upper - lower), lower + self.golden_ratio * (upper - lower)
+        left_weights, right_weights = self.solve_weights(left), self.solve_weights(right)
+        left_score, right_score = score(left_weights), score(right_weights)
+        while upper - lower > self.tolerance * max(self.target_returns[-1] - self.target_returns[0], np.finfo(float).tiny):
+            if left_score >= best_score:
+                best_weights, best_score = left_weights, left_score
+            if right_score >= best_score:
+                best_weights, best_score = right_weights, right_score
+            if left_score >= right_score:
+                upper, right, right_weights, right_score = right, left, left_weights, left_score
+                left = upper - self.golden_ratio * (upper - lower)
+                left_weights = self.solve_weights(left)
+                left_score = score(left_weights)
+            else:
+                lower, left, left_weights, left_score = left, right, right_weights, right_score
+                right = lower + self.golden_ratio * (upper - lower)
+                right_weights = self.solve_weights(right)
+                right_score = score(right_weights)
+        return best_weights
+
+    def get_min_std(self) -> PortfolioResult:
+        weights: np.array = self.maximize(lambda w: -self.calculate_standard_deviation(w), self.argmin('annualized_standard_deviations'))
+        return self.create_portfolio_result(weights)
+
+    def get_max_sharpe_ratio(self) -> PortfolioResult:
+        return self.create_portfolio_result(self.maximize(self.calculate_sharpe_ratio, self.argmax('sharpe_ratios')))
+
+    def get_max_return_same_std(self, annualized_standard_deviation: float) -> PortfolioResult:
+        # Above the min std portfolio the std grows with the target return, a std outside the frontier gets its closest end.
+        min_std_index: int = self.argmin('annualized_standard_deviations')
+        efficient_stds: np.array = self.annualized_standard_deviations[min_std_index:]
+        if annualized_standard_deviation <= efficient_stds[0]:
+            return self.get_min_std()
+        if annualized_standard_deviation >= efficient_stds[-1]:
+            return self[len(self) - 1]
+        upper_index: int = min_std_index + int(np.argmax(efficient_stds >= annualized_standard_deviation))
+        lower, upper = self.target_returns[upper_index - 1], self.target_returns[upper_index]
+        weights: np.array = self.weights[upper_index - 1]
+        while upper - lower > self.tolerance * max(self.target_returns[-1] - self.target_returns[0], np.finfo(float).tiny):
+            middle: float = (lower + upper) / 2
+            middle_weights: np.array = self.solve_weights(middle)
+            if self.calculate_standard_deviation(middle_weights) <= annualized_standard_deviation:
+                lower, weights = middle, middle_weights
+            else:
+                upper = middle
+        return self.create_portfolio_result(weights)
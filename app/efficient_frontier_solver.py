@@ -0,0 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from quandratic_solver import QuadraticSolver
+from risk_model.risk_model import RiskModel
+
+
+class EfficientFrontierSolver:
+
+    def __init__(self, mean_returns: np.array, H: RiskModel, nr_of_workers: int = 1, segment_size: int = 50,
+                 solver: QuadraticSolver = None):
+        self.mean_returns: np.array = mean_returns
+        self.H: RiskModel = H
+        self.nr_of_workers: int = nr_of_workers
+        self.segment_size: int = segment_size
+        self.solver: QuadraticSolver = solver if solver is not None else QuadraticSolver()
+        self.x0: np.array = np.array([1 / len(mean_returns)] * len(mean_returns))
+        self.iterations: np.array = np.array([], dtype=int)
+
+    def get_expected_returns(self, nr_of_points: int) -> np.array:
+        return np.linspace(min(self.mean_returns), max(self.mean_returns), nr_of_points, endpoint=True)
+
+    def solve(self, nr_of_points: int) -> np.array:
+        expected_returns: np.array = self.get_expected_returns(nr_of_points)
+        # Segments are independent of the worker count so that the pooled and sequential paths warm-start identically.
+        segments: [np.array] = [expected_returns[i:i + self.segment_size] for i in range(0, nr_of_points, self.segment_size)]
+        if self.nr_of_workers > 1 and len(segments) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.nr_of_workers, len(segments))) as executor:
+                segment_results: [(np.array, np.array)] = list(executor.map(self.solve_segment, segments))
+        else:
+            segment_results: [(np.array, np.array)] = [self.solve_segment(segment) for segment in segments]
+        self.iterations = np.concatenate([iterations for _, iterations in segment_results])
+        return np.vstack([solutions for solutions, _ in segment_results])
+
+    def solve_segment(self, expected_returns: np.array) -> (np.array, np.array):
+        x: np.array = self.x0
+        solutions: [np.array] = []
+        iterations: [int] = []
+        for expected_return in expected_returns:
+            result = self.solver.solve_frontier_point(self.H, self.mean_returns, expected_return, x)
+            x = result["x"]
+            solutions.append(x)
+            iterations.append(result.get("nit", 0))
+        return np.array(solutions), np.array(iterations, dtype=int)
+
+    def check_backends_agree(self, nr_of_checks: int = 5) -> bool:
+        return all(self.solver.check_backends_agree(self.H, self.mean_returns, expected_return, self.x0)
+                   for expected_return in self.get_expected_returns(nr_of_checks))
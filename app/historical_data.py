@@ -1,36 +1,163 @@
-import yfinance as yf
-from pandas import DataFrame
-from yfinance import Tickers
+import copy
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from data_source.market_data_source import MarketDataSource
+from return_statistics import ReturnStatistics, RollingReturnStatistics
+from risk_model.covariance_estimator import CovarianceEstimator
+from risk_model.risk_model import RiskModel
+from risk_model.sample_covariance_estimator import SampleCovarianceEstimator
+from utils.run_profiler import RunProfiler
 
 
 class HistoricalData:
 
-    def __init__(self, symbols: [str], start_date: str, end_date: str):
+    def __init__(self, symbols: [str], start_date: str, end_date: str, data_source: MarketDataSource = None,
+                 use_adjusted_close: bool = False, profiler: RunProfiler = None, returns_storage: str = "memory",
+                 storage_directory: str = None, block_size: int = 256, estimator: CovarianceEstimator = None):
         print("Gathering Historical Data...")
-        self.tickers: Tickers = yf.Tickers(symbols)
-        self.historical_data: DataFrame = yf.download(symbols, start=start_date, end=end_date)
-        self.closing_prices: DataFrame = self.historical_data["Close"]
-        self.returns: DataFrame = self.calculate_returns() * 100
-        self.mean_returns: DataFrame = self.returns.mean()
-        self.covariance_returns: DataFrame = self.returns.cov()
-        self.correlation_returns: DataFrame = self.returns.corr()
-        self.correlation_adjusted_covariance: DataFrame = self.returns.cov() * self.returns.corr()
+        if data_source is None:
+            from data_source.yahoo_market_data_source import YahooMarketDataSource
+            data_source = YahooMarketDataSource()
+        self.data_source: MarketDataSource = data_source
+        self.profiler: RunProfiler = profiler if profiler is not None else RunProfiler()
+        if returns_storage == "mmap":
+            with self.profiler.stage("memory_mapped_returns"):
+                self.load_memory_mapped_returns(symbols, start_date, end_date, use_adjusted_close, storage_directory, block_size)
+            with self.profiler.stage("return_statistics"):
+                self.set_statistics(ReturnStatistics.from_blocks(self.returns_array, self.returns.columns.values.tolist(), block_size))
+        else:
+            with self.profiler.stage("download"):
+                if use_adjusted_close:
+                    self.closing_prices: DataFrame = self.data_source.get_adjusted_closing_prices(symbols, start_date, end_date)
+                    self.dividends: {str, Series} = {}
+                else:
+                    self.closing_prices: DataFrame = self.data_source.get_closing_prices(symbols, start_date, end_date)
+                    self.dividends: {str, Series} = self.data_source.get_dividends(symbols, start_date, end_date)
+            with self.profiler.stage("dividend_adjustment"):
+                self.returns: DataFrame = self.calculate_returns() * 100
+            with self.profiler.stage("return_statistics"):
+                self.set_statistics(ReturnStatistics(self.returns))
+        self.estimator: CovarianceEstimator = estimator if estimator is not None else SampleCovarianceEstimator()
+        with self.profiler.stage("risk_model"):
+            self.risk_model: RiskModel = self.estimator.estimate(self.returns, self.statistics)
+        for counter in ["cache_hits", "cache_misses"]:
+            if hasattr(self.data_source, counter):
+                self.profiler.increment(counter, getattr(self.data_source, counter))
+
+    # Memory-mapped returns are pickled as the path of their file and mapped again when unpickled, so they are neither copied into
+    # the pickle nor loaded into memory. A selection holds a copy of the returns, which is pickled as is.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["data_source"], state["profiler"] = None, None
+        state.pop("temporary_directory", None)
+        if isinstance(state.get("returns_array"), np.memmap) and np.may_share_memory(self.returns.to_numpy(copy=False), self.returns_array):
+            state["returns_path"] = os.path.abspath(self.returns_array.filename)
+            state["returns_index"], state["returns_columns"] = self.returns.index, self.returns.columns
+            del state["returns_array"], state["returns"]
+        return state
+
+    def __setstate__(self, state: dict):
+        returns_path: str = state.pop("returns_path", None)
+        if returns_path is not None:
+            state["returns_array"] = np.load(returns_path, mmap_mode="r")
+            state["returns"] = DataFrame(state["returns_array"], index=state.pop("returns_index"), columns=state.pop("returns_columns"),
+                                         copy=False)
+        self.__dict__.update(state)
+
+    # Loads the symbols in blocks and writes their returns into a memory-mapped file, so at most one block of prices is held in
+    # memory. Only the latest closing prices are kept once the returns are derived.
+    def load_memory_mapped_returns(self, symbols: [str], start_date: str, end_date: str, use_adjusted_close: bool,
+                                   storage_directory: str, block_size: int):
+        if storage_directory is None:
+            self.temporary_directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory(prefix="returns_")
+            storage_directory = self.temporary_directory.name
+        os.makedirs(storage_directory, exist_ok=True)
+        self.dividends: {str, Series} = {}
+        blocks: [(str, pd.DatetimeIndex, [str])] = []
+        latest_closing_prices: [DataFrame] = []
+        for block_start in range(0, len(symbols), block_size):
+            block_symbols: [str] = symbols[block_start:block_start + block_size]
+            if use_adjusted_close:
+                closing_prices: DataFrame = self.data_source.get_adjusted_closing_prices(block_symbols, start_date, end_date)
+                dividends: {str, Series} = {}
+            else:
+                closing_prices: DataFrame = self.data_source.get_closing_prices(block_symbols, start_date, end_date)
+                dividends: {str, Series} = self.data_source.get_dividends(block_symbols, start_date, end_date)
+            block_path: str = os.path.join(storage_directory, f"prices_{block_start}.npy")
+            np.save(block_path, (closing_prices - self.create_aligned_dividends(closing_prices, dividends)).to_numpy(dtype=np.float64))
+            blocks.append((block_path, closing_prices.index, closing_prices.columns.values.tolist()))
+            latest_closing_prices.append(closing_prices.iloc[-1:].copy())
+            self.dividends.update(dividends)
+
+        dates: pd.DatetimeIndex = blocks[0][1]
+        for _, block_dates, _ in blocks[1:]:
+            dates = dates.union(block_dates)
+        columns: [str] = [symbol for _, _, block_symbols in blocks for symbol in block_symbols]
+        # Column-major, so a block of symbols is one contiguous range of the file. Every block is written through its own short
+        # lived mapping, which keeps the written pages from accumulating in the resident set.
+        returns_path: str = os.path.join(storage_directory, "returns.npy")
+        np.lib.format.open_memmap(returns_path, mode="w+", dtype=np.float64, shape=(len(dates), len(columns)), fortran_order=True).flush()
+        column: int = 0
+        for block_path, block_dates, block_symbols in blocks:
+            prices: DataFrame = DataFrame(np.load(block_path, mmap_mode="r"), index=block_dates, columns=block_symbols).reindex(dates)
+            returns_array: np.memmap = np.load(returns_path, mmap_mode="r+")
+            returns_array[:, column:column + len(block_symbols)] = prices.pct_change().to_numpy(dtype=np.float64) * 100
+            returns_array.flush()
+            column += len(block_symbols)
+            del prices, returns_array
+            os.remove(block_path)
+        self.returns_array: np.memmap = np.load(returns_path, mmap_mode="r")
+        self.returns: DataFrame = DataFrame(self.returns_array, index=dates, columns=columns, copy=False)
+        self.closing_prices: DataFrame = pd.concat(latest_closing_prices, axis=1).reindex(index=dates[-1:], columns=columns)
+
+    # Shares the loaded prices of a superset of symbols, the statistics are sliced from the already computed covariance.
+    def select(self, symbols: [str]) -> 'HistoricalData':
+        selected_symbols: [str] = [symbol for symbol in symbols if symbol in set(self.symbols)]
+        selection: HistoricalData = copy.copy(self)
+        selection.closing_prices = self.closing_prices[selected_symbols]
+        selection.dividends = {symbol: dividends for symbol, dividends in self.dividends.items() if symbol in selected_symbols}
+        selection.returns = self.returns[selected_symbols]
+        selection.set_statistics(self.statistics.select(selected_symbols))
+        selection.risk_model = self.risk_model.select(self.returns.columns.get_indexer(selected_symbols))
+        return selection
+
+    def set_statistics(self, statistics: ReturnStatistics):
+        self.statistics: ReturnStatistics = statistics
+        self.symbols: [str] = self.returns.columns.values.tolist()
+        self.mean_returns: Series = self.statistics.mean_returns
+        self.covariance_returns: DataFrame = self.statistics.covariance
+        self.correlation_returns: DataFrame = self.statistics.correlation
+        self.correlation_adjusted_covariance: DataFrame = self.statistics.correlation_adjusted_covariance
+        self.mean_returns_array: np.array = self.statistics.mean_returns_array
+        self.correlation_adjusted_covariance_array: np.array = self.statistics.correlation_adjusted_covariance_array
 
     def calculate_returns(self) -> DataFrame:
-        dividends_adjusted_closing_price: DataFrame = self.closing_prices.copy()
-        for symbol in self.tickers.symbols:
-            symbol_dividends: DataFrame = self.tickers.tickers[symbol].dividends
-            for date in symbol_dividends.index:
-                if date in dividends_adjusted_closing_price.index:
-                    dividends_adjusted_closing_price.loc[date, symbol]: DataFrame = dividends_adjusted_closing_price.loc[date, symbol] - \
-                                                                                    symbol_dividends[date]
-        return dividends_adjusted_closing_price.pct_change()
-
-    def get_latest_closing_prices(self, symbols: [str]) -> dict:
-        symbol_to_value = {}
-        for symbol in symbols:
-            symbol_to_value[symbol] = self.get_latest_closing_price(symbol)
-        return symbol_to_value
+        return (self.closing_prices - self.create_aligned_dividends(self.closing_prices, self.dividends)).pct_change()
+
+    @staticmethod
+    def create_aligned_dividends(closing_prices: DataFrame, dividends: {str, Series}) -> DataFrame:
+        symbol_to_dividends: {str, Series} = {symbol: symbol_dividends.groupby(level=0).sum() for symbol, symbol_dividends in dividends.items()
+                                              if len(symbol_dividends) > 0}
+        if not symbol_to_dividends:
+            return DataFrame(0.0, index=closing_prices.index, columns=closing_prices.columns)
+        return pd.concat(symbol_to_dividends, axis=1).reindex(index=closing_prices.index, columns=closing_prices.columns).fillna(0.0)
+
+    def iterate_rolling_statistics(self, window_size: int, step: int) -> (int, RollingReturnStatistics):
+        returns: np.array = self.returns.dropna().to_numpy(dtype=np.float64)
+        statistics: RollingReturnStatistics = RollingReturnStatistics(returns[:window_size])
+        for window_end in range(window_size, len(returns), step):
+            yield window_end, statistics
+            for row in range(window_end, min(window_end + step, len(returns))):
+                statistics.add(returns[row])
+                statistics.drop(returns[row - window_size])
+
+    def get_latest_closing_prices(self, symbols: [str]) -> np.array:
+        return self.closing_prices.iloc[-1].reindex(symbols).to_numpy(dtype=np.float64)
 
     def get_latest_closing_price(self, symbol: str) -> float:
         return self.closing_prices[symbol].iloc[-1]
@@ -1,13 +1,18 @@
-from typing import List
-
-from model.position import Position
+import numpy as np
 
 
+# Positions as arrays aligned by symbol, so values and weights are computed in bulk.
 class Portfolio:
 
-    def __init__(self, symbol_to_position: {str, Position}):
-        self.symbol_to_position: {str, Position} = symbol_to_position
-        self.value: float = sum(position.value for position in self.symbol_to_position.values())
+    def __init__(self, symbols: [str], quantities: np.array, latest_prices: np.array):
+        self.symbols: [str] = symbols
+        self.quantities: np.array = np.asarray(quantities, dtype=np.float64)
+        self.latest_prices: np.array = np.asarray(latest_prices, dtype=np.float64)
+        self.values: np.array = self.quantities * self.latest_prices
+        self.value: float = float(self.values.sum())
+        self.weights: np.array = self.values / self.value
 
-    def calculate_position_weight(self, symbol: str) -> float:
-        return self.symbol_to_position[symbol].value / self.value
+    # A portfolio of the given weights with every price at latest_price, the way the optimized portfolios are presented.
+    @classmethod
+    def from_weights(cls, symbols: [str], weights: np.array, latest_price: float = 100) -> 'Portfolio':
+        return cls(symbols, weights, np.full(len(symbols), latest_price, dtype=np.float64))
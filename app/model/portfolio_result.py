@@ -2,49 +2,46 @@ import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
-from model.portfolio_result_item import PortfolioResultItem
+from model.portfolio import Portfolio
+from risk_model.risk_model import RiskModel
 
 
 class PortfolioResult:
-    def __init__(self, symbol_to_portfolio_result_item: {str, PortfolioResultItem}, mean_returns: DataFrame, correlation_adjusted_cov: DataFrame,
-                 value: float):
-        self.symbol_to_portfolio_result_item: {str, PortfolioResultItem} = symbol_to_portfolio_result_item
-        self.symbols_in_correct_order: [str] = mean_returns.index.values.tolist()
+    def __init__(self, portfolio: Portfolio, symbols_in_correct_order: [str], mean_returns: np.array, risk_model: RiskModel):
+        self.portfolio: Portfolio = portfolio
+        self.symbols_in_correct_order: [str] = symbols_in_correct_order
         self.weights: np.array = self.build_weight_array()
-        self.portfolio_value: float = value
+        self.portfolio_value: float = portfolio.value
         nr_of_trading_days = 252
-        self.annualized_expected_returns: float = self.calculate_expected_return(mean_returns.to_numpy()) * nr_of_trading_days
-        self.annualized_corr_adj_variance: float = self.calculate_corr_adj_variance(correlation_adjusted_cov.to_numpy()) * nr_of_trading_days
+        self.annualized_expected_returns: float = self.calculate_expected_return(mean_returns) * nr_of_trading_days
+        self.annualized_corr_adj_variance: float = self.calculate_corr_adj_variance(risk_model) * nr_of_trading_days
         self.annualized_standard_deviation: float = np.sqrt(self.annualized_corr_adj_variance)
 
     def calculate_expected_return(self, mean_returns: np.array) -> float:
         return mean_returns.dot(self.weights.T)
 
-    def calculate_corr_adj_variance(self, correlation_adjusted_cov: np.array) -> float:
-        return self.weights.dot(correlation_adjusted_cov).dot(self.weights.T)
+    def calculate_corr_adj_variance(self, risk_model: RiskModel) -> float:
+        return float(risk_model.variances(self.weights))
 
     def build_weight_array(self) -> np.array:
-        weights = []
-        for symbol in self.symbols_in_correct_order:
-            weights.append(self.symbol_to_portfolio_result_item[symbol].weight)
-
-        return np.array(weights)
+        if self.portfolio.symbols == self.symbols_in_correct_order:
+            return self.portfolio.weights
+        return self.portfolio.weights[pd.Index(self.portfolio.symbols).get_indexer(self.symbols_in_correct_order)]
 
     def get_result_dataframe(self) -> DataFrame:
         index = ["Quantity", "Weight %", "Last Price", "Value"]
-        df = pd.DataFrame(columns=self.symbols_in_correct_order + ["Total"], index=index)
-        for idx, item in enumerate(self.symbol_to_portfolio_result_item.values()):
-            df.loc["Quantity", item.symbol] = round(item.quantity, 3)
-            df.loc["Weight %", item.symbol] = round(item.weight * 100, 3)
-            df.loc["Last Price", item.symbol] = round(item.last_price, 3)
-            df.loc["Value", item.symbol] = round(item.value, 3)
-        df.loc["Value", "Total"] = round(df.loc["Value", :].sum(), 3)
+        rows: np.array = np.round([self.portfolio.quantities, self.portfolio.weights * 100, self.portfolio.latest_prices,
+                                   self.portfolio.values], 3)
+        df = pd.DataFrame(rows, index=index, columns=self.portfolio.symbols).reindex(columns=self.symbols_in_correct_order + ["Total"])
+        df = df.astype(object)
+        df.loc["Value", "Total"] = round(rows[3].sum(), 3)
         return df.fillna('')
 
-    def get_result_statistics_dataframe(self) -> DataFrame:
-        headers = ["Expected Return", "Correlation Adjusted Variance", "Standard Deviation"]
+    def get_result_statistics_dataframe(self, variance_label: str = "Correlation Adjusted Variance",
+                                        standard_deviation_label: str = "Correlation Adjusted Standard Deviation") -> DataFrame:
+        headers = ["Expected Return", variance_label, standard_deviation_label]
         df = pd.DataFrame(columns=headers, index=[0])
         df.loc[0, "Expected Return"] = round(self.annualized_expected_returns, 3)
-        df.loc[0, "Correlation Adjusted Variance"] = round(self.annualized_corr_adj_variance, 3)
-        df.loc[0, "Standard Deviation"] = round(self.annualized_standard_deviation, 3)
+        df.loc[0, variance_label] = round(self.annualized_corr_adj_variance, 3)
+        df.loc[0, standard_deviation_label] = round(self.annualized_standard_deviation, 3)
         return df.fillna('')
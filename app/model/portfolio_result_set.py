@@ -0,0 +1,75 @@
+import numpy as np
+
+from model.portfolio import Portfolio
+from model.portfolio_result import PortfolioResult
+from risk_model.risk_model import RiskModel
+
+
+class PortfolioResultSet:
+    def __init__(self, weights: np.array, annualized_expected_returns: np.array, annualized_corr_adj_variances: np.array,
+                 symbols_in_correct_order: [str], mean_returns: np.array, risk_model: RiskModel, risk_free_return: float):
+        self.symbols_in_correct_order: [str] = symbols_in_correct_order
+        self.mean_returns: np.array = mean_returns
+        self.risk_model: RiskModel = risk_model
+        self.risk_free_return: float = risk_free_return
+        self.weights: np.array = np.ascontiguousarray(weights, dtype=np.float64)
+        self.annualized_expected_returns: np.array = np.ascontiguousarray(annualized_expected_returns, dtype=np.float64)
+        self.annualized_corr_adj_variances: np.array = np.ascontiguousarray(annualized_corr_adj_variances, dtype=np.float64)
+        self.annualized_standard_deviations: np.array = np.sqrt(self.annualized_corr_adj_variances)
+        self.sharpe_ratios: np.array = (self.annualized_expected_returns - risk_free_return) / self.annualized_standard_deviations
+        self.index_to_portfolio_result: {int, PortfolioResult} = {}
+
+    @classmethod
+    def from_weights(cls, weights: np.array, symbols_in_correct_order: [str], mean_returns: np.array, risk_model: RiskModel,
+                     risk_free_return: float) -> 'PortfolioResultSet':
+        weights = weights / weights.sum(axis=1, keepdims=True)
+        expected_returns, corr_adj_variances = PortfolioResultSet.calculate_annualized_statistics(weights, mean_returns,
+                                                                                                  risk_model)
+        return cls(weights, expected_returns, corr_adj_variances, symbols_in_correct_order, mean_returns, risk_model,
+                   risk_free_return)
+
+    @staticmethod
+    def calculate_annualized_statistics(weights: np.array, mean_returns: np.array, risk_model: RiskModel) \
+            -> (np.array, np.array):
+        nr_of_trading_days = 252
+        expected_returns: np.array = weights.dot(mean_returns) * nr_of_trading_days
+        corr_adj_variances: np.array = risk_model.variances(weights) * nr_of_trading_days
+        return expected_returns, corr_adj_variances
+
+    def __len__(self):
+        return len(self.annualized_expected_returns)
+
+    def __getitem__(self, index: int) -> PortfolioResult:
+        index = int(index)
+        if index not in self.index_to_portfolio_result:
+            self.index_to_portfolio_result[index] = self.create_portfolio_result(self.weights[index])
+        return self.index_to_portfolio_result[index]
+
+    def argmax(self, column: str) -> int:
+        return int(np.argmax(getattr(self, column)))
+
+    def argmin(self, column: str) -> int:
+        return int(np.argmin(getattr(self, column)))
+
+    def filter(self, mask: np.array) -> 'PortfolioResultSet':
+        return PortfolioResultSet(self.weights[mask], self.annualized_expected_returns[mask], self.annualized_corr_adj_variances[mask],
+                                  self.symbols_in_correct_order, self.mean_returns, self.risk_model, self.risk_free_return)
+
+    def get_max_return(self) -> PortfolioResult:
+        return self[self.argmax('annualized_expected_returns')]
+
+    def get_min_std(self) -> PortfolioResult:
+        return self[self.argmin('annualized_standard_deviations')]
+
+    def get_max_sharpe_ratio(self) -> PortfolioResult:
+        return self[self.argmax('sharpe_ratios')]
+
+    def get_max_return_same_std(self, annualized_standard_deviation: float, tolerance: float = 0.01) -> PortfolioResult:
+        matching_std: np.array = np.abs(self.annualized_standard_deviations - annualized_standard_deviation) < tolerance
+        if not matching_std.any():
+            return self[0]
+        return self[int(np.argmax(np.where(matching_std, self.annualized_expected_returns, -np.inf)))]
+
+    def create_portfolio_result(self, weights: np.array) -> PortfolioResult:
+        return PortfolioResult(Portfolio.from_weights(self.symbols_in_correct_order, weights), self.symbols_in_correct_order,
+                               self.mean_returns, self.risk_model)
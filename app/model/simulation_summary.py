@@ -0,0 +1,100 @@
+import numpy as np
+
+from model.portfolio_result_set import PortfolioResultSet
+from risk_model.risk_model import RiskModel
+
+
+# Running aggregate of streamed simulation chunks. It keeps the rows the report selects plus a bounded uniform sample for
+# plotting, chosen as the rows with the smallest random priorities, so memory does not grow with the number of simulations.
+class SimulationSummary:
+
+    def __init__(self, current_standard_deviation: float, risk_free_return: float, sample_size: int, std_tolerance: float = 0.01):
+        self.current_standard_deviation: float = current_standard_deviation
+        self.risk_free_return: float = risk_free_return
+        self.sample_size: int = sample_size
+        self.std_tolerance: float = std_tolerance
+        self.nr_of_simulations: int = 0
+        self.label_to_best: {str, (float, np.array, float, float)} = {}
+        self.sample_weights: np.array = None
+        self.sample_expected_returns: np.array = None
+        self.sample_corr_adj_variances: np.array = None
+        self.sample_priorities: np.array = None
+
+    def update(self, weights: np.array, expected_returns: np.array, corr_adj_variances: np.array, priorities: np.array):
+        standard_deviations: np.array = np.sqrt(corr_adj_variances)
+        matching_std: np.array = np.abs(standard_deviations - self.current_standard_deviation) < self.std_tolerance
+        if self.nr_of_simulations == 0:
+            self.keep_best("first", 0, 0.0, weights, expected_returns, corr_adj_variances)
+        self.keep_best("min_std", np.argmin(standard_deviations), -standard_deviations.min(), weights, expected_returns,
+                       corr_adj_variances)
+        self.keep_best("max_return", np.argmax(expected_returns), expected_returns.max(), weights, expected_returns,
+                       corr_adj_variances)
+        sharpe_ratios: np.array = (expected_returns - self.risk_free_return) / standard_deviations
+        self.keep_best("max_sharpe_ratio", np.argmax(sharpe_ratios), sharpe_ratios.max(), weights, expected_returns, corr_adj_variances)
+        if matching_std.any():
+            matching_std_returns: np.array = np.where(matching_std, expected_returns, -np.inf)
+            self.keep_best("matching_std_highest_return", np.argmax(matching_std_returns), matching_std_returns.max(), weights,
+                           expected_returns, corr_adj_variances)
+        self.update_sample(weights, expected_returns, corr_adj_variances, priorities)
+        self.nr_of_simulations += len(weights)
+
+    def merge(self, other: 'SimulationSummary'):
+        for label, best in other.label_to_best.items():
+            if label not in self.label_to_best or best[0] > self.label_to_best[label][0]:
+                self.label_to_best[label] = best
+        if other.sample_priorities is not None:
+            self.update_sample(other.sample_weights, other.sample_expected_returns, other.sample_corr_adj_variances, other.sample_priorities)
+        self.nr_of_simulations += other.nr_of_simulations
+
+    def create_empty(self) -> 'SimulationSummary':
+        return SimulationSummary(self.current_standard_deviation, self.risk_free_return, self.sample_size, self.std_tolerance)
+
+    # Only then can the highest return at another current std be reselected exactly from the kept rows.
+    def holds_every_simulation(self) -> bool:
+        return self.nr_of_simulations <= self.sample_size
+
+    # Reselects the highest return at a new current std from the kept rows. This is exact while the sample holds every simulated
+    # portfolio, i.e. plot_sample_size >= nr_of_simulations, otherwise it is the highest return within the sample.
+    def set_current_standard_deviation(self, current_standard_deviation: float):
+        self.current_standard_deviation = current_standard_deviation
+        self.label_to_best.pop("matching_std_highest_return", None)
+        best: [()] = list(self.label_to_best.values())
+        weights: np.array = np.vstack([[row[1] for row in best], self.sample_weights])
+        expected_returns: np.array = np.concatenate([[row[2] for row in best], self.sample_expected_returns])
+        corr_adj_variances: np.array = np.concatenate([[row[3] for row in best], self.sample_corr_adj_variances])
+        matching_std: np.array = np.abs(np.sqrt(corr_adj_variances) - current_standard_deviation) < self.std_tolerance
+        if matching_std.any():
+            matching_std_returns: np.array = np.where(matching_std, expected_returns, -np.inf)
+            self.keep_best("matching_std_highest_return", np.argmax(matching_std_returns), matching_std_returns.max(), weights,
+                           expected_returns, corr_adj_variances)
+
+    def keep_best(self, label: str, index: int, score: float, weights: np.array, expected_returns: np.array,
+                  corr_adj_variances: np.array):
+        if label not in self.label_to_best or score > self.label_to_best[label][0]:
+            self.label_to_best[label] = (score, weights[index].copy(), expected_returns[index], corr_adj_variances[index])
+
+    def update_sample(self, weights: np.array, expected_returns: np.array, corr_adj_variances: np.array, priorities: np.array):
+        if self.sample_priorities is not None and len(self.sample_priorities) >= self.sample_size:
+            candidates: np.array = priorities < self.sample_priorities[-1]
+            weights, expected_returns = weights[candidates], expected_returns[candidates]
+            corr_adj_variances, priorities = corr_adj_variances[candidates], priorities[candidates]
+        if self.sample_priorities is not None:
+            weights = np.concatenate([self.sample_weights, weights])
+            expected_returns = np.concatenate([self.sample_expected_returns, expected_returns])
+            corr_adj_variances = np.concatenate([self.sample_corr_adj_variances, corr_adj_variances])
+            priorities = np.concatenate([self.sample_priorities, priorities])
+        kept: np.array = np.argsort(priorities, kind="stable")[:self.sample_size]
+        self.sample_weights = weights[kept]
+        self.sample_expected_returns = expected_returns[kept]
+        self.sample_corr_adj_variances = corr_adj_variances[kept]
+        self.sample_priorities = priorities[kept]
+
+    def to_portfolio_result_set(self, symbols_in_correct_order: [str], mean_returns: np.array, risk_model: RiskModel) \
+            -> PortfolioResultSet:
+        # The first simulated row leads the set since it is the fallback when no portfolio matches the current std.
+        best: [()] = [self.label_to_best[label] for label in ["first", "min_std", "max_return", "matching_std_highest_return",
+                                                              "max_sharpe_ratio"] if label in self.label_to_best]
+        return PortfolioResultSet(np.vstack([[row[1] for row in best], self.sample_weights]),
+                                  np.concatenate([[row[2] for row in best], self.sample_expected_returns]),
+                                  np.concatenate([[row[3] for row in best], self.sample_corr_adj_variances]),
+                                  symbols_in_correct_order, mean_returns, risk_model, self.risk_free_return)
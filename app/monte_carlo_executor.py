@@ -0,0 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model.simulation_summary import SimulationSummary
+from monte_carlo_simulator import MonteCarloSimulator
+
+
+class MonteCarloExecutor:
+
+    def __init__(self, simulator: MonteCarloSimulator, nr_of_workers: int = 1, chunk_size: int = 10000, seed: int = None):
+        self.simulator: MonteCarloSimulator = simulator
+        self.nr_of_workers: int = nr_of_workers
+        self.chunk_size: int = chunk_size
+        self.seed_sequence: np.random.SeedSequence = np.random.SeedSequence(seed)
+
+    def run(self, nr_of_simulations: int, summary: SimulationSummary) -> SimulationSummary:
+        chunk_sizes: [int] = [min(self.chunk_size, nr_of_simulations - i) for i in range(0, nr_of_simulations, self.chunk_size)]
+        # Every chunk gets its own stream spawned from the seed, so the drawn weights depend on the chunk and not on the worker.
+        chunks: [(int, np.random.SeedSequence)] = list(zip(chunk_sizes, self.seed_sequence.spawn(len(chunk_sizes))))
+        nr_of_partitions: int = max(min(self.nr_of_workers, len(chunks)), 1)
+        partition_bounds: np.array = np.linspace(0, len(chunks), nr_of_partitions + 1).astype(int)
+        partitions: [[(int, np.random.SeedSequence)]] = [chunks[start:end] for start, end in zip(partition_bounds[:-1], partition_bounds[1:])]
+        if nr_of_partitions > 1:
+            with ProcessPoolExecutor(max_workers=nr_of_partitions) as executor:
+                partition_summaries: [SimulationSummary] = list(executor.map(self.simulate_partition, partitions,
+                                                                             [summary.create_empty()] * nr_of_partitions))
+        else:
+            partition_summaries: [SimulationSummary] = [self.simulate_partition(partition, summary.create_empty()) for partition in partitions]
+        # Partitions are contiguous and merged in chunk order, which keeps ties resolved as in a sequential run.
+        for partition_summary in partition_summaries:
+            summary.merge(partition_summary)
+        return summary
+
+    def simulate_partition(self, chunks: [(int, np.random.SeedSequence)], summary: SimulationSummary) -> SimulationSummary:
+        for chunk_size, seed_sequence in chunks:
+            summary.update(*self.simulator.simulate_chunk(chunk_size, np.random.default_rng(seed_sequence)))
+        return summary
@@ -0,0 +1,29 @@
+import numpy as np
+
+from risk_model.risk_model import RiskModel
+
+
+class MonteCarloSimulator:
+
+    def __init__(self, mean_returns: np.array, risk_model: RiskModel):
+        self.mean_returns: np.array = mean_returns
+        self.risk_model: RiskModel = risk_model
+        self.nr_of_trading_days = 252
+
+    def simulate_chunk(self, nr_of_simulations: int, generator: np.random.Generator) -> (np.array, np.array, np.array, np.array):
+        weights: np.array = self.simulate_weights(nr_of_simulations, generator)
+        return (weights,
+                self.calculate_annualized_expected_returns(weights),
+                self.calculate_annualized_corr_adj_variances(weights),
+                generator.random(nr_of_simulations))
+
+    def simulate_weights(self, nr_of_simulations: int, generator: np.random.Generator) -> np.array:
+        weights: np.array = generator.random((nr_of_simulations, len(self.mean_returns)))
+        weights /= weights.sum(axis=1, keepdims=True)
+        return weights
+
+    def calculate_annualized_expected_returns(self, weights: np.array) -> np.array:
+        return weights.dot(self.mean_returns) * self.nr_of_trading_days
+
+    def calculate_annualized_corr_adj_variances(self, weights: np.array) -> np.array:
+        return self.risk_model.variances(weights) * self.nr_of_trading_days
@@ -1,124 +1,240 @@
-import csv
-
 import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
 
+from analysis_cache import AnalysisCache
+from data_source.market_data_source import MarketDataSource
+from efficient_frontier import EfficientFrontier
+from efficient_frontier_solver import EfficientFrontierSolver
 from historical_data import HistoricalData
 from model.portfolio import Portfolio
 from model.portfolio_result import PortfolioResult
-from model.portfolio_result_item import PortfolioResultItem
-from model.position import Position
-from portfolio_analysis_report_builder import PortfolioAnalysisReportBuilder
-from quandratic_solver import QuadraticSolver
+from model.portfolio_result_set import PortfolioResultSet
+from model.simulation_summary import SimulationSummary
+from monte_carlo_executor import MonteCarloExecutor
+from monte_carlo_simulator import MonteCarloSimulator
+from portfolio_result_exporter import PortfolioResultExporter
+from quandratic_solver import ActiveSetBackend, QuadraticSolver, SlsqpBackend
+from risk_engine import RiskEngine
+from risk_model.covariance_estimator import CovarianceEstimator
+from utils.run_profiler import RunProfiler
 from utils.utils import Utils
+from walk_forward_backtester import WalkForwardBacktester
 
 
 class PortfolioAnalyser:
-    def __init__(self, historical_years: int, positions_file_path: str, risk_free_return: float):
-        self.symbols: [str] = self.get_symbols_from_csv(positions_file_path)
-        self.historical_data: HistoricalData = HistoricalData(
-            symbols=self.symbols,
-            start_date=Utils.get_date_string_today_n_years_back(historical_years),
-            end_date=Utils.get_date_string_yesterday(),
-        )
-        symbol_to_position: {str, Position} = self.create_positions_from_csv(positions_file_path)
-        self.current_portfolio: Portfolio = Portfolio(symbol_to_position)
-        self.report_builder: PortfolioAnalysisReportBuilder = PortfolioAnalysisReportBuilder(self.historical_data, risk_free_return)
-
-    def create_analysis_report(self, report_output_directory: str):
+    def __init__(self, historical_years: int, positions_file_path: str, risk_free_return: float, frontier_points: int = 100,
+                 frontier_workers: int = 1, qp_backend: str = "active-set", check_qp_backends: bool = False,
+                 data_source: MarketDataSource = None, use_adjusted_close: bool = False, report_workers: int = 1,
+                 report_pages: [str] = None, scatter_mode: str = "raster", max_plot_points: int = None, nr_of_simulations: int = 50000,
+                 chunk_size: int = 10000, plot_sample_size: int = 50000, simulation_workers: int = 1, seed: int = None,
+                 confidence_level: float = 0.95, stress_scenarios_file_path: str = None, historical_data: HistoricalData = None,
+                 profiler: RunProfiler = None, returns_storage: str = "memory", returns_storage_directory: str = None,
+                 estimator: CovarianceEstimator = None, analysis_cache: AnalysisCache = None, quantities: Series = None):
+        self.profiler: RunProfiler = profiler if profiler is not None else RunProfiler()
+        # The quantities per symbol replace the positions file when given, e.g. by the analysis server.
+        self.quantities: Series = quantities if quantities is not None else self.read_positions_csv(positions_file_path)
+        self.symbols: [str] = self.quantities.index.tolist()
+        self.confidence_level: float = confidence_level
+        self.stress_scenarios: DataFrame = RiskEngine.read_stress_scenarios(stress_scenarios_file_path) if stress_scenarios_file_path \
+            else None
+        self.analysis_cache: AnalysisCache = analysis_cache
+        self.cached_analysis: dict = {}
+        self.analysis_key: str = None
+        if historical_data is None:
+            start_date: str = Utils.get_date_string_today_n_years_back(historical_years)
+            end_date: str = Utils.get_date_string_yesterday()
+            if self.analysis_cache is not None:
+                # Everything except the quantities of the positions, so a quantity change reuses the cached analysis. The data source
+                # fingerprints tell apart prices of other sources, directories or file versions for the same symbols and dates.
+                self.analysis_key = AnalysisCache.create_key(dict(
+                    symbols=self.symbols, start_date=start_date, end_date=end_date, use_adjusted_close=use_adjusted_close,
+                    data_source={symbol: data_source.get_fingerprint(symbol) for symbol in self.symbols} if data_source is not None else None,
+                    returns_storage=returns_storage,
+                    estimator=[type(estimator).__name__, vars(estimator)] if estimator is not None else None, seed=seed,
+                    nr_of_simulations=nr_of_simulations, chunk_size=chunk_size, plot_sample_size=plot_sample_size,
+                    frontier_points=frontier_points, qp_backend=qp_backend, risk_free_return=risk_free_return,
+                    max_plot_points=max_plot_points, scatter_mode=scatter_mode, confidence_level=confidence_level,
+                    stress_scenarios=self.stress_scenarios.to_dict() if self.stress_scenarios is not None else None))
+                self.cached_analysis = self.analysis_cache.load(self.analysis_key) or {}
+                self.profiler.increment("analysis_cache_hits" if self.cached_analysis else "analysis_cache_misses")
+            if "historical_data" in self.cached_analysis:
+                print("Using cached analysis...")
+                self.historical_data: HistoricalData = self.cached_analysis["historical_data"]
+            else:
+                # Memory-mapped returns of a cached analysis are kept in the cache, which only pickles the path of their file.
+                if self.analysis_key is not None and returns_storage == "mmap":
+                    returns_storage_directory = self.analysis_cache.get_storage_directory(self.analysis_key)
+                self.historical_data: HistoricalData = HistoricalData(
+                    symbols=self.symbols,
+                    start_date=start_date,
+                    end_date=end_date,
+                    data_source=data_source,
+                    use_adjusted_close=use_adjusted_close,
+                    profiler=self.profiler,
+                    returns_storage=returns_storage,
+                    storage_directory=returns_storage_directory,
+                    estimator=estimator,
+                )
+                self.cached_analysis["historical_data"] = self.historical_data
+        else:
+            self.historical_data: HistoricalData = historical_data.select(self.symbols)
+        self.current_portfolio: Portfolio = self.create_portfolio(self.quantities)
+        self.risk_free_return: float = risk_free_return
+        self.frontier_points: int = frontier_points
+        self.frontier_workers: int = frontier_workers
+        self.quadratic_solver: QuadraticSolver = QuadraticSolver(SlsqpBackend() if qp_backend == "slsqp" else ActiveSetBackend())
+        self.check_qp_backends: bool = check_qp_backends
+        self.nr_of_simulations: int = nr_of_simulations
+        self.chunk_size: int = chunk_size
+        self.plot_sample_size: int = plot_sample_size
+        self.simulation_workers: int = simulation_workers
+        self.seed: int = seed
+        self.report_workers: int = report_workers
+        self.report_pages: [str] = report_pages
+        self.scatter_mode: str = scatter_mode
+        self.max_plot_points: int = max_plot_points
+
+    def create_analysis_report(self, report_output_directory: str, output_format: str = "pdf"):
         current_portfolio_result: PortfolioResult = self.create_portfolio_result(self.current_portfolio)
-        simulated_portfolio_results: [PortfolioResult] = self.simulate_portfolio_result()
-        optimization_portfolio_results: [PortfolioResult] = self.optimization_portfolio_result()
-
-        self.report_builder.build_report(report_output_directory, current_portfolio_result, simulated_portfolio_results,
-                                         optimization_portfolio_results)
-
-    def optimization_portfolio_result(self) -> [PortfolioResult]:
+        with self.profiler.stage("simulation"):
+            simulated_portfolio_results: PortfolioResultSet = self.simulate_portfolio_result(current_portfolio_result)
+        with self.profiler.stage("optimization"):
+            optimization_portfolio_results: EfficientFrontier = self.optimization_portfolio_result()
+        label_to_portfolio_result: {str, PortfolioResult} = self.select_portfolio_results(current_portfolio_result,
+                                                                                          simulated_portfolio_results,
+                                                                                          optimization_portfolio_results)
+        with self.profiler.stage("risk"):
+            risk_metrics: {str, DataFrame} = self.calculate_risk_metrics(label_to_portfolio_result, simulated_portfolio_results,
+                                                                         optimization_portfolio_results)
+        with self.profiler.stage("report"):
+            if output_format == "pdf":
+                rendered_pages: {str, bytes} = self.create_report_builder().build_report(
+                    report_output_directory, label_to_portfolio_result, simulated_portfolio_results, optimization_portfolio_results,
+                    risk_metrics=risk_metrics,
+                    fingerprint_to_rendered_page=self.cached_analysis.get("rendered_pages", {}) if self.analysis_key is not None else None)
+                self.cached_analysis["rendered_pages"] = rendered_pages
+            else:
+                exporter: PortfolioResultExporter = PortfolioResultExporter(self.historical_data.symbols, self.risk_free_return)
+                exporter.export(report_output_directory, output_format, label_to_portfolio_result, optimization_portfolio_results,
+                                risk_metrics)
+        self.save_cached_analysis()
+
+    def save_cached_analysis(self):
+        if self.analysis_key is not None:
+            self.analysis_cache.save(self.analysis_key, self.cached_analysis)
+
+    def create_report_builder(self):
+        # Imported here since matplotlib and seaborn dominate the start up time and are not needed for json or csv output.
+        from portfolio_analysis_report_builder import PortfolioAnalysisReportBuilder
+        return PortfolioAnalysisReportBuilder(self.historical_data, self.risk_free_return,
+                                              nr_of_workers=self.report_workers,
+                                              pages=self.report_pages,
+                                              scatter_mode=self.scatter_mode,
+                                              max_plot_points=self.max_plot_points,
+                                              profiler=self.profiler)
+
+    @staticmethod
+    def select_portfolio_results(current_portfolio_result: PortfolioResult,
+                                 simulated_portfolio_results: PortfolioResultSet,
+                                 optimization_portfolio_results: EfficientFrontier) -> {str, PortfolioResult}:
+        current_std: float = current_portfolio_result.annualized_standard_deviation
+        return {
+            "Current": current_portfolio_result,
+            "Sim: Min Std": simulated_portfolio_results.get_min_std(),
+            "Sim: Max Return": simulated_portfolio_results.get_max_return(),
+            "Sim: Current Std Max Return": simulated_portfolio_results.get_max_return_same_std(current_std),
+            "Opt: Min Std": optimization_portfolio_results.get_min_std(),
+            "Opt: Max Return": optimization_portfolio_results.get_max_return(),
+            "Opt: Current Std Max Return": optimization_portfolio_results.get_max_return_same_std(current_std),
+            "Opt: Max Sharpe Ratio": optimization_portfolio_results.get_max_sharpe_ratio(),
+        }
+
+    # Tail risk of the selected portfolios, the frontier points and the simulated portfolios kept in the result set. The rows of the
+    # frontier and the simulated portfolios do not depend on the quantities and are cached with the analysis.
+    def calculate_risk_metrics(self, label_to_portfolio_result: {str, PortfolioResult}, simulated_portfolio_results: PortfolioResultSet,
+                               optimization_portfolio_results: EfficientFrontier) -> {str, DataFrame}:
+        print("Calculating risk metrics...", end=" ")
+        risk_engine: RiskEngine = RiskEngine(self.historical_data.returns, self.confidence_level, self.stress_scenarios)
+        portfolio_risk_metrics: DataFrame = risk_engine.calculate(np.vstack([result.weights for result in label_to_portfolio_result.values()]))
+        portfolio_risk_metrics.index = list(label_to_portfolio_result.keys())
+        if "efficient_frontier_risk_metrics" not in self.cached_analysis:
+            self.cached_analysis["efficient_frontier_risk_metrics"] = risk_engine.calculate(optimization_portfolio_results.weights)
+        if "simulated_risk_metrics" not in self.cached_analysis:
+            self.cached_analysis["simulated_risk_metrics"] = risk_engine.calculate(simulated_portfolio_results.weights)
+        risk_metrics: {str, DataFrame} = {
+            "portfolios": portfolio_risk_metrics,
+            "efficient_frontier": self.cached_analysis["efficient_frontier_risk_metrics"],
+            "simulated": self.cached_analysis["simulated_risk_metrics"],
+        }
+        print("Done!")
+        return risk_metrics
+
+    def run_walk_forward_backtest(self, window_size: int, rebalance_days: int, output_path: str):
+        backtester: WalkForwardBacktester = WalkForwardBacktester(self.historical_data, window_size, rebalance_days, self.frontier_points,
+                                                                  self.risk_free_return, self.quadratic_solver, self.historical_data.estimator)
+        with self.profiler.stage("backtest"):
+            backtest: DataFrame = backtester.run()
+        backtest.to_csv(output_path)
+        print(backtester.summarize(backtest).round(3).to_string())
+        print(f"Backtest saved: {output_path}")
+        self.save_cached_analysis()
+
+    def optimization_portfolio_result(self) -> EfficientFrontier:
         print("Calculating Optimized portfolio results...", end=" ")
-        mean_returns: np.array = self.historical_data.mean_returns.to_numpy()
-        max_mean_returns: float = max(mean_returns)
-        min_mean_returns: float = min(mean_returns)
-        H: np.array = self.historical_data.correlation_adjusted_covariance.to_numpy()
-        A: np.array = np.array([mean_returns, np.ones(len(self.symbols))])
-        c: np.array = np.zeros(len(self.symbols))
-        c0: np.array = np.zeros(len(self.symbols))
-        x0: np.array = np.array([1 / len(self.symbols)] * len(self.symbols))
-
-        portfolio_results: [PortfolioResult] = []
-        for expected_return in np.linspace(min_mean_returns, max_mean_returns, 500, endpoint=True):
-            b: np.array = np.array([expected_return, 1])
-            constraints: [{}] = [{'type': 'eq',
-                                  'fun': lambda x: np.dot(A, x) - b,
-                                  'jac': lambda x: A}]
-            bounds: [()] = [(0, None)] * len(self.symbols)
-            result = QuadraticSolver.solve(H, c, c0, x0, constraints, bounds)
-
-            symbol_to_positions: {str, Position} = {}
-            for index, quantity in enumerate(result["x"]):
-                current_symbol: str = self.historical_data.mean_returns.index.to_numpy()[index]
-                symbol_to_positions[current_symbol] = Position(current_symbol, quantity, latest_price=100)
-            portfolio_results.append(
-                self.create_portfolio_result(Portfolio(symbol_to_positions))
-            )
+        if "efficient_frontier" in self.cached_analysis:
+            print("Done!")
+            return self.cached_analysis["efficient_frontier"]
+        frontier_solver: EfficientFrontierSolver = EfficientFrontierSolver(self.historical_data.mean_returns_array,
+                                                                           self.historical_data.risk_model,
+                                                                           nr_of_workers=self.frontier_workers,
+                                                                           solver=self.quadratic_solver)
+        if self.check_qp_backends and not frontier_solver.check_backends_agree():
+            print("Warning: quadratic solver backends disagree on the efficient frontier...", end=" ")
+        efficient_frontier: EfficientFrontier = EfficientFrontier(frontier_solver, self.frontier_points, self.historical_data.symbols,
+                                                                  self.risk_free_return)
+        self.profiler.add_series("solver_iterations_per_frontier_point", frontier_solver.iterations)
+        self.cached_analysis["efficient_frontier"] = efficient_frontier
         print("Done!")
-        return portfolio_results
+        return efficient_frontier
 
-    def simulate_portfolio_result(self) -> [PortfolioResult]:
+    def simulate_portfolio_result(self, current_portfolio_result: PortfolioResult) -> PortfolioResultSet:
         print("Calculating Simulated portfolio results...", end=" ")
-        nr_of_simulations = 50000
-        portfolio_results: [PortfolioResult] = []
-        for simulation in range(0, nr_of_simulations):
-            quantities: np.array = np.random.random(len(self.symbols))
-            quantities /= sum(quantities)
-
-            symbol_to_positions: {str, Position} = {}
-
-            for index, quantity in enumerate(quantities):
-                current_symbol: str = self.symbols[index]
-                symbol_to_positions[current_symbol] = Position(current_symbol, quantity, latest_price=100)
-
-            portfolio_results.append(
-                self.create_portfolio_result(Portfolio(symbol_to_positions))
-            )
+        summary: SimulationSummary = self.cached_analysis.get("simulation_summary")
+        # A summary that only kept a sample of the simulations is simulated again, the reselection would not be exact.
+        if summary is not None and summary.holds_every_simulation():
+            summary.set_current_standard_deviation(current_portfolio_result.annualized_standard_deviation)
+        else:
+            simulator: MonteCarloSimulator = MonteCarloSimulator(self.historical_data.mean_returns_array,
+                                                                 self.historical_data.risk_model)
+            summary = SimulationSummary(current_portfolio_result.annualized_standard_deviation, self.risk_free_return, self.plot_sample_size)
+            executor: MonteCarloExecutor = MonteCarloExecutor(simulator, nr_of_workers=self.simulation_workers, chunk_size=self.chunk_size,
+                                                              seed=self.seed)
+            executor.run(self.nr_of_simulations, summary)
+            self.profiler.increment("simulated_portfolios", summary.nr_of_simulations)
+            self.cached_analysis["simulation_summary"] = summary
+            self.cached_analysis.pop("simulated_risk_metrics", None)
+        portfolio_results: PortfolioResultSet = summary.to_portfolio_result_set(self.historical_data.symbols,
+                                                                                self.historical_data.mean_returns_array,
+                                                                                self.historical_data.risk_model)
         print("Done!")
         return portfolio_results
 
     def create_portfolio_result(self, portfolio: Portfolio) -> PortfolioResult:
-        symbol_to_portfolio_result_item: {str, PortfolioResultItem} = {}
-        for symbol, position in portfolio.symbol_to_position.items():
-            symbol_to_portfolio_result_item[symbol] = PortfolioResultItem(
-                symbol,
-                portfolio.calculate_position_weight(symbol),
-                portfolio.symbol_to_position[symbol].latest_price,
-                portfolio.symbol_to_position[symbol].quantity,
-                portfolio.symbol_to_position[symbol].value,
-            )
-
-        return PortfolioResult(symbol_to_portfolio_result_item,
-                               self.historical_data.mean_returns,
-                               self.historical_data.correlation_adjusted_covariance,
-                               portfolio.value)
-
-    def create_positions_from_csv(self, positions_file_path: str) -> {str, Position}:
-        symbol_to_positions: {str, Position} = {}
-        with open(positions_file_path) as file:
-            type(file)
-            csvreader = csv.reader(file)
-            next(csvreader)
-            for position in csvreader:
-                symbol = position[0].strip()
-                quantity = float(position[1].strip())
-                latest_price = self.historical_data.get_latest_closing_price(symbol)
-                symbol_to_positions[symbol] = Position(symbol, quantity, latest_price)
-
-        return symbol_to_positions
-
-    def get_symbols_from_csv(self, positions_file_path: str) -> [str]:
-        symbols: [str] = []
-        with open(positions_file_path) as file:
-            type(file)
-            csvreader = csv.reader(file)
-            next(csvreader)
-            for position in csvreader:
-                symbols.append(position[0].strip())
-
-        return symbols
+        return PortfolioResult(portfolio, self.historical_data.symbols, self.historical_data.mean_returns_array,
+                               self.historical_data.risk_model)
+
+    def create_portfolio(self, quantities: Series) -> Portfolio:
+        symbols: [str] = quantities.index.tolist()
+        return Portfolio(symbols, quantities.to_numpy(dtype=np.float64), self.historical_data.get_latest_closing_prices(symbols))
+
+    # Files of several accounts list a symbol once per account, its quantities are summed in the order of first appearance.
+    @staticmethod
+    def read_positions_csv(positions_file_path: str) -> Series:
+        positions: DataFrame = pd.read_csv(positions_file_path, usecols=[0, 1], skipinitialspace=True)
+        symbols: Series = positions.iloc[:, 0].astype(str).str.strip()
+        return positions.iloc[:, 1].astype(np.float64).groupby(symbols.to_numpy(), sort=False).sum()
+
+    @staticmethod
+    def get_symbols_from_csv(positions_file_path: str) -> [str]:
+        return PortfolioAnalyser.read_positions_csv(positions_file_path).index.tolist()
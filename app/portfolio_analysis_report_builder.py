@@ -1,4 +1,7 @@
-from operator import attrgetter
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import time
+from io import BytesIO
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -9,121 +12,263 @@ from pandas import DataFrame
 
 from historical_data import HistoricalData
 from model.portfolio_result import PortfolioResult
-
-sns.set()
-sns.color_palette()
+from model.portfolio_result_set import PortfolioResultSet
+from report_options import ReportOptions
+from risk_model.covariance_estimator import CovarianceEstimator
+from utils.run_profiler import RunProfiler
 
 
 class PortfolioAnalysisReportBuilder:
+    report_pages: [str] = ReportOptions.report_pages
+    scatter_modes: [str] = ReportOptions.scatter_modes
 
-    def __init__(self, historical_data: HistoricalData, risk_free_return: float):
+    def __init__(self, historical_data: HistoricalData, risk_free_return: float, nr_of_workers: int = 1, pages: [str] = None,
+                 scatter_mode: str = "raster", max_plot_points: int = None, profiler: RunProfiler = None):
         self.historical_data: HistoricalData = historical_data
         self.risk_free_return: float = risk_free_return
+        self.nr_of_workers: int = nr_of_workers
+        self.pages: [str] = pages if pages else self.report_pages
+        self.scatter_mode: str = scatter_mode
+        self.max_plot_points: int = max_plot_points
+        self.profiler: RunProfiler = profiler if profiler is not None else RunProfiler()
+        self.set_plot_style()
+
+    @staticmethod
+    def set_plot_style():
+        sns.set()
+        sns.color_palette()
 
     def build_report(self, report_output_directory: str,
-                     current_portfolio_result: PortfolioResult,
-                     simulated_portfolio_results: [PortfolioResult],
-                     optimization_portfolio_results: [PortfolioResult]):
+                     label_to_portfolio_result: {str, PortfolioResult},
+                     simulated_portfolio_results: PortfolioResultSet,
+                     optimization_portfolio_results: PortfolioResultSet,
+                     risk_metrics: {str, DataFrame} = None,
+                     fingerprint_to_rendered_page: {str, bytes} = None) -> {str, bytes}:
         print("Building report...")
-        sim_max_return: PortfolioResult = max(simulated_portfolio_results, key=attrgetter('annualized_expected_returns'))
-        sim_min_std: PortfolioResult = min(simulated_portfolio_results, key=attrgetter('annualized_standard_deviation'))
-        sim_matching_std_highest_return: PortfolioResult = self.get_max_return_same_std(current_portfolio_result,
-                                                                                        simulated_portfolio_results)
-        opt_max_return: PortfolioResult = max(optimization_portfolio_results, key=attrgetter('annualized_expected_returns'))
-        opt_min_std: PortfolioResult = min(optimization_portfolio_results, key=attrgetter('annualized_standard_deviation'))
-        opt_matching_std_highest_return: PortfolioResult = self.get_max_return_same_std(current_portfolio_result,
-                                                                                        optimization_portfolio_results)
-        opt_max_sharpe_ratio: PortfolioResult = self.get_max_sharpe_ratio(optimization_portfolio_results)
-
-        pp = PdfPages(report_output_directory)
-        self.add_historical_data(pp)
-        pp.savefig(self.create_expected_return_std_plot(optimization_portfolio_results,
-                                                        simulated_portfolio_results,
-                                                        current_portfolio_result,
-                                                        sim_min_std,
-                                                        sim_max_return,
-                                                        sim_matching_std_highest_return,
-                                                        opt_min_std,
-                                                        opt_max_return,
-                                                        opt_matching_std_highest_return,
-                                                        opt_max_sharpe_ratio)
-                   , bbox_inches='tight')
-        pp.savefig(self.add_portfolio_annualized_statistics(current_portfolio_result,
-                                                            sim_min_std,
-                                                            sim_max_return,
-                                                            sim_matching_std_highest_return,
-                                                            opt_min_std,
-                                                            opt_max_return,
-                                                            opt_matching_std_highest_return,
-                                                            opt_max_sharpe_ratio)
-                   , bbox_inches='tight')
-        pp.savefig(self.add_portfolio_weight_barplot_portfolio(current_portfolio_result,
-                                                               sim_min_std,
-                                                               sim_max_return,
-                                                               sim_matching_std_highest_return,
-                                                               opt_min_std,
-                                                               opt_max_return,
-                                                               opt_matching_std_highest_return,
-                                                               opt_max_sharpe_ratio)
-                   , bbox_inches='tight')
-        pp.savefig(
-            self.add_portfolio_weight_barplot_stock(current_portfolio_result,
-                                                    sim_min_std,
-                                                    sim_max_return,
-                                                    sim_matching_std_highest_return,
-                                                    opt_min_std,
-                                                    opt_max_return,
-                                                    opt_matching_std_highest_return,
-                                                    opt_max_sharpe_ratio),
-            bbox_inches='tight')
-        pp.savefig(self.add_portfolio_weight_table(current_portfolio_result,
-                                                   sim_min_std,
-                                                   sim_max_return,
-                                                   sim_matching_std_highest_return,
-                                                   opt_min_std,
-                                                   opt_max_return,
-                                                   opt_matching_std_highest_return,
-                                                   opt_max_sharpe_ratio),
-                   bbox_inches='tight')
-        pp.savefig(self.add_portfolio_data(current_portfolio_result, 'Current Portfolio Data'), bbox_inches='tight')
-        pp.savefig(self.add_portfolio_data(sim_max_return, 'Sim: Max Return Portfolio Data'), bbox_inches='tight')
-        pp.savefig(self.add_portfolio_data(sim_min_std, 'Sim: Min Std Portfolio Data'), bbox_inches='tight')
-        pp.savefig(self.add_portfolio_data(sim_matching_std_highest_return, 'Sim: Current Std Max Return Portfolio Data'),
-                   bbox_inches='tight')
-        pp.savefig(self.add_portfolio_data(opt_max_return, 'Opt: Max Return Portfolio Data'), bbox_inches='tight')
-        pp.savefig(self.add_portfolio_data(opt_min_std, 'Opt: Min Std Portfolio Data'), bbox_inches='tight')
-        pp.savefig(self.add_portfolio_data(opt_matching_std_highest_return, 'Opt: Current Std Max Return Portfolio Data'),
-                   bbox_inches='tight')
-        pp.savefig(self.add_portfolio_data(opt_max_sharpe_ratio, 'Opt: Max Sharpe Ratio Portfolio Data'),
-                   bbox_inches='tight')
-        pp.close()
+        page_tasks: [()] = self.create_page_tasks(label_to_portfolio_result, simulated_portfolio_results, optimization_portfolio_results,
+                                                  risk_metrics)
+        rendered_pages: {str, bytes} = {}
+        if fingerprint_to_rendered_page is not None or (self.nr_of_workers > 1 and len(page_tasks) > 1):
+            rendered_pages = self.render_pages(report_output_directory, page_tasks, fingerprint_to_rendered_page or {})
+        else:
+            with PdfPages(report_output_directory) as pp:
+                for page_number, page_task in enumerate(page_tasks):
+                    with self.profiler.stage(self.get_page_stage_name(page_number, page_task)):
+                        self.save_page(pp, PortfolioAnalysisReportBuilder.create_page(page_task))
 
         print(f"Report saved: {report_output_directory}")
+        return rendered_pages
+
+    def create_page_tasks(self, label_to_portfolio_result: {str, PortfolioResult},
+                          simulated_portfolio_results: PortfolioResultSet,
+                          optimization_portfolio_results: PortfolioResultSet,
+                          risk_metrics: {str, DataFrame} = None) -> [()]:
+        weights: DataFrame = self.create_weights_dataframe(label_to_portfolio_result)
+        page_tasks: [()] = []
+        if "mean" in self.pages:
+            page_tasks.append((PortfolioAnalysisReportBuilder.add_mean_to_report, (self.historical_data.mean_returns,)))
+        if "covariance" in self.pages:
+            page_tasks.append((PortfolioAnalysisReportBuilder.add_covariance_to_report, (self.historical_data.covariance_returns,)))
+        if "correlation" in self.pages:
+            page_tasks.append((PortfolioAnalysisReportBuilder.add_correlation_to_report, (self.historical_data.correlation_returns,)))
+        if "expected-return-std" in self.pages:
+            plot_indices: np.array = self.sample_plot_indices(simulated_portfolio_results.annualized_expected_returns,
+                                                              simulated_portfolio_results.annualized_standard_deviations,
+                                                              self.max_plot_points)
+            page_tasks.append((PortfolioAnalysisReportBuilder.create_expected_return_std_plot,
+                               (optimization_portfolio_results.annualized_expected_returns,
+                                optimization_portfolio_results.annualized_standard_deviations,
+                                simulated_portfolio_results.annualized_expected_returns[plot_indices],
+                                simulated_portfolio_results.annualized_standard_deviations[plot_indices],
+                                {label: (result.annualized_expected_returns, result.annualized_standard_deviation)
+                                 for label, result in label_to_portfolio_result.items()},
+                                self.historical_data.mean_returns_array * 252,
+                                np.sqrt(self.historical_data.risk_model.diagonal() * 252),
+                                self.scatter_mode,
+                                self.historical_data.estimator.standard_deviation_label)))
+        if "statistics" in self.pages:
+            page_tasks.append((PortfolioAnalysisReportBuilder.add_portfolio_annualized_statistics,
+                               (self.create_statistics_dataframe(label_to_portfolio_result, self.historical_data.estimator),)))
+        if "weight-barplot-portfolio" in self.pages:
+            page_tasks.append((PortfolioAnalysisReportBuilder.add_portfolio_weight_barplot_portfolio, (weights,)))
+        if "weight-barplot-stock" in self.pages:
+            page_tasks.append((PortfolioAnalysisReportBuilder.add_portfolio_weight_barplot_stock, (weights,)))
+        if "weight-table" in self.pages:
+            page_tasks.append((PortfolioAnalysisReportBuilder.add_portfolio_weight_table, (weights,)))
+        if "portfolio-data" in self.pages:
+            for label in ["Current", "Sim: Max Return", "Sim: Min Std", "Sim: Current Std Max Return", "Opt: Max Return", "Opt: Min Std",
+                          "Opt: Current Std Max Return", "Opt: Max Sharpe Ratio"]:
+                page_tasks.append((PortfolioAnalysisReportBuilder.add_portfolio_data,
+                                   (label_to_portfolio_result[label], f"{label} Portfolio Data")))
+        if risk_metrics is not None and "risk" in self.pages:
+            page_tasks.append((PortfolioAnalysisReportBuilder.add_risk_metrics, (risk_metrics["portfolios"].T.round(3),)))
+        if risk_metrics is not None and "expected-return-cvar" in self.pages:
+            plot_indices: np.array = self.sample_plot_indices(simulated_portfolio_results.annualized_expected_returns,
+                                                              risk_metrics["simulated"]["Historical CVaR"].to_numpy(), self.max_plot_points)
+            page_tasks.append((PortfolioAnalysisReportBuilder.create_expected_return_cvar_plot,
+                               (optimization_portfolio_results.annualized_expected_returns,
+                                risk_metrics["efficient_frontier"]["Historical CVaR"].to_numpy(),
+                                simulated_portfolio_results.annualized_expected_returns[plot_indices],
+                                risk_metrics["simulated"]["Historical CVaR"].to_numpy()[plot_indices],
+                                {label: (result.annualized_expected_returns, risk_metrics["portfolios"].loc[label, "Historical CVaR"])
+                                 for label, result in label_to_portfolio_result.items()},
+                                self.scatter_mode)))
+        return page_tasks
+
+    @staticmethod
+    def sample_plot_indices(expected_returns: np.array, standard_deviations: np.array, max_plot_points: int,
+                            nr_of_strata: int = 200) -> np.array:
+        if max_plot_points is None or len(expected_returns) <= max_plot_points:
+            return np.arange(len(expected_returns))
+
+        std_range: float = max(standard_deviations.max() - standard_deviations.min(), np.finfo(float).eps)
+        strata: np.array = np.minimum(((standard_deviations - standard_deviations.min()) / std_range * nr_of_strata).astype(int),
+                                      nr_of_strata - 1)
+        # The min/max std portfolios and the highest and lowest return of every std stratum trace the edges of the cloud.
+        by_stratum_and_return: np.array = np.lexsort((expected_returns, strata))
+        stratum_starts: np.array = np.flatnonzero(np.diff(strata[by_stratum_and_return], prepend=-1))
+        stratum_ends: np.array = np.append(stratum_starts[1:], len(strata)) - 1
+        edge_indices: np.array = np.unique(np.concatenate([by_stratum_and_return[stratum_starts], by_stratum_and_return[stratum_ends],
+                                                           [np.argmin(standard_deviations), np.argmax(standard_deviations)]]))
+
+        stratum_sizes: np.array = np.bincount(strata, minlength=nr_of_strata)
+        stratum_quotas: np.array = np.floor(stratum_sizes * max(max_plot_points - len(edge_indices), 0) / len(strata)).astype(int)
+        priorities: np.array = np.random.default_rng(0).random(len(strata))
+        by_stratum_and_priority: np.array = np.lexsort((priorities, strata))
+        sorted_strata: np.array = strata[by_stratum_and_priority]
+        rank_in_stratum: np.array = np.arange(len(strata)) - np.searchsorted(sorted_strata, sorted_strata, side="left")
+        sampled_indices: np.array = by_stratum_and_priority[rank_in_stratum < stratum_quotas[sorted_strata]]
+        return np.union1d(edge_indices, sampled_indices)
+
+    @staticmethod
+    def create_page(page_task: ()):
+        page_function, page_arguments = page_task
+        return page_function(*page_arguments)
+
+    # Rendering dominates the report time, so pages are rendered to single page pdfs, by a pool of workers when there are several,
+    # and merged in page order. Pages whose inputs are unchanged are taken from the already rendered pages by their fingerprint.
+    def render_pages(self, report_output_directory: str, page_tasks: [()], fingerprint_to_rendered_page: {str, bytes}) -> {str, bytes}:
+        from pypdf import PdfReader, PdfWriter
+        fingerprints: [str] = [self.get_page_fingerprint(page_task) for page_task in page_tasks]
+        missing_page_numbers: [int] = [page_number for page_number, fingerprint in enumerate(fingerprints)
+                                       if fingerprint not in fingerprint_to_rendered_page]
+        missing_page_tasks: [()] = [page_tasks[page_number] for page_number in missing_page_numbers]
+        if self.nr_of_workers > 1 and len(missing_page_tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.nr_of_workers, len(missing_page_tasks))) as executor:
+                rendered_missing_pages: [()] = list(executor.map(PortfolioAnalysisReportBuilder.render_page, missing_page_tasks))
+        else:
+            rendered_missing_pages: [()] = [PortfolioAnalysisReportBuilder.render_page(page_task) for page_task in missing_page_tasks]
+
+        rendered_pages: {str, bytes} = {fingerprint: fingerprint_to_rendered_page[fingerprint] for fingerprint in fingerprints
+                                        if fingerprint in fingerprint_to_rendered_page}
+        for page_number, (rendered_page, wall_time, memory_before, memory_after) in zip(missing_page_numbers, rendered_missing_pages):
+            self.profiler.record(self.get_page_stage_name(page_number, page_tasks[page_number]), wall_time, memory_before, memory_after)
+            rendered_pages[fingerprints[page_number]] = rendered_page
+        self.profiler.increment("reused_report_pages", len(page_tasks) - len(missing_page_tasks))
+
+        writer: PdfWriter = PdfWriter()
+        for fingerprint in fingerprints:
+            for page in PdfReader(BytesIO(rendered_pages[fingerprint])).pages:
+                writer.add_page(page)
+        with open(report_output_directory, "wb") as file:
+            writer.write(file)
+        return rendered_pages
+
+    @staticmethod
+    def get_page_fingerprint(page_task: ()) -> str:
+        page_function, page_arguments = page_task
+        digest = hashlib.sha256(page_function.__name__.encode())
+        PortfolioAnalysisReportBuilder.update_page_fingerprint(digest, page_arguments)
+        return digest.hexdigest()
+
+    # Hashes the page arguments in a canonical form instead of their pickle, whose object sharing differs between a fresh run and a
+    # run on a cached analysis. Every value is tagged by its type so different arguments can not hash the same.
+    @staticmethod
+    def update_page_fingerprint(digest, value):
+        if isinstance(value, PortfolioResult):
+            value = (value.portfolio.symbols, value.portfolio.quantities, value.portfolio.latest_prices, value.symbols_in_correct_order,
+                     value.annualized_expected_returns, value.annualized_corr_adj_variance, value.annualized_standard_deviation)
+        elif isinstance(value, (DataFrame, pd.Series)):
+            value = (type(value).__name__, value.to_numpy(), value.index.to_numpy(),
+                     value.columns.to_numpy() if isinstance(value, DataFrame) else value.name)
+        elif isinstance(value, np.generic):
+            value = value.item()
+
+        digest.update(type(value).__name__.encode())
+        if isinstance(value, np.ndarray):
+            digest.update(f"{value.dtype}{value.shape}".encode())
+            digest.update(repr(value.tolist()).encode() if value.dtype == object else np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, dict):
+            digest.update(str(len(value)).encode())
+            for key, item in value.items():
+                PortfolioAnalysisReportBuilder.update_page_fingerprint(digest, key)
+                PortfolioAnalysisReportBuilder.update_page_fingerprint(digest, item)
+        elif isinstance(value, (list, tuple)):
+            digest.update(str(len(value)).encode())
+            for item in value:
+                PortfolioAnalysisReportBuilder.update_page_fingerprint(digest, item)
+        elif isinstance(value, (str, int, float, bool)) or value is None:
+            digest.update(repr(value).encode())
+        else:
+            raise TypeError(f"Page argument of type {type(value).__name__} can not be fingerprinted")
+
+    @staticmethod
+    def render_page(page_task: ()) -> (bytes, float, (float, float), (float, float)):
+        memory_before: (float, float) = RunProfiler.get_memory_mb()
+        start_time: float = time.perf_counter()
+        PortfolioAnalysisReportBuilder.set_plot_style()
+        fig = PortfolioAnalysisReportBuilder.create_page(page_task)
+        rendered_page: BytesIO = BytesIO()
+        fig.savefig(rendered_page, format='pdf', bbox_inches='tight')
+        plt.close(fig)
+        return rendered_page.getvalue(), time.perf_counter() - start_time, memory_before, RunProfiler.get_memory_mb()
+
+    @staticmethod
+    def get_page_stage_name(page_number: int, page_task: ()) -> str:
+        return f"report_page_{page_number:02d}_{page_task[0].__name__}"
+
+    @staticmethod
+    def save_page(pp: PdfPages, fig):
+        pp.savefig(fig, bbox_inches='tight')
+        plt.close(fig)
+
+    @staticmethod
+    def create_weights_dataframe(label_to_portfolio_result: {str, PortfolioResult}) -> DataFrame:
+        symbols: [str] = label_to_portfolio_result["Current"].symbols_in_correct_order
+        return pd.DataFrame([np.round(result.weights * 100, 3) for result in label_to_portfolio_result.values()],
+                            index=list(label_to_portfolio_result.keys()), columns=symbols)
 
-    def add_historical_data(self, pp: PdfPages):
-        pp.savefig(self.add_mean_to_report(self.historical_data.mean_returns), bbox_inches='tight')
-        pp.savefig(self.add_covariance_to_report(self.historical_data.covariance_returns), bbox_inches='tight')
-        pp.savefig(self.add_correlation_to_report(self.historical_data.correlation_returns), bbox_inches='tight')
+    @staticmethod
+    def create_statistics_dataframe(label_to_portfolio_result: {str, PortfolioResult}, estimator: CovarianceEstimator) -> DataFrame:
+        return pd.DataFrame({label: [round(result.annualized_expected_returns, 3),
+                                     round(result.annualized_corr_adj_variance, 3),
+                                     round(result.annualized_standard_deviation, 3)]
+                             for label, result in label_to_portfolio_result.items()},
+                            index=["Expected Return", estimator.variance_label, estimator.standard_deviation_label])
 
-    def add_mean_to_report(self, mean_returns: DataFrame):
+    @staticmethod
+    def add_mean_to_report(mean_returns: DataFrame):
         fig, axes = plt.subplots(1, figsize=(12, 4))
         fig.suptitle('Annualized Return Means', fontsize=16)
         sns.barplot(ax=axes, x=mean_returns.index, y=mean_returns.values * 252)
         return fig
 
-    def add_covariance_to_report(self, covariance: DataFrame):
+    @staticmethod
+    def add_covariance_to_report(covariance: DataFrame):
         fig, axes = plt.subplots(1, figsize=(12, 4))
         fig.suptitle('Annualized Return Covariance', fontsize=16)
         sns.heatmap(ax=axes, data=covariance * 252, annot=True)
         return fig
 
-    def add_correlation_to_report(self, correlation: DataFrame):
+    @staticmethod
+    def add_correlation_to_report(correlation: DataFrame):
         fig, axes = plt.subplots(1, figsize=(12, 4))
         fig.suptitle('Return Correlation', fontsize=16)
         sns.heatmap(ax=axes, data=correlation, annot=True)
         return fig
 
-    def add_portfolio_data(self, current_portfolio_result: PortfolioResult, title: str):
+    @staticmethod
+    def add_portfolio_data(current_portfolio_result: PortfolioResult, title: str):
         df = current_portfolio_result.get_result_dataframe()
         df = df.reset_index(level=0)
         df = df.rename({'index': ''}, axis='columns')
@@ -134,27 +279,9 @@ class PortfolioAnalysisReportBuilder:
         axes.table(cellText=df.values, colLabels=df.columns, loc='center')
         return fig
 
-    def add_portfolio_weight_table(self, current_portfolio_result: PortfolioResult,
-                                   sim_min_std: PortfolioResult,
-                                   sim_max_return: PortfolioResult,
-                                   sim_matching_std_highest_return: PortfolioResult,
-                                   opt_min_std: PortfolioResult,
-                                   opt_max_return: PortfolioResult,
-                                   opt_matching_std_highest_return: PortfolioResult,
-                                   opt_max_sharpe_ratio: PortfolioResult):
-        headers = current_portfolio_result.symbols_in_correct_order
-        df = pd.DataFrame(columns=headers,
-                          index=["Current", "Sim: Min Std", "Sim: Max Return", "Sim: Current Std Max Return", "Opt: Min Std",
-                                 "Opt: Max Return", "Opt: Current Std Max Return"])
-        df.loc["Current", :] = current_portfolio_result.get_result_dataframe().iloc[1]
-        df.loc["Sim: Min Std", :] = sim_min_std.get_result_dataframe().iloc[1]
-        df.loc["Sim: Max Return", :] = sim_max_return.get_result_dataframe().iloc[1]
-        df.loc["Sim: Current Std Max Return", :] = sim_matching_std_highest_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Min Std", :] = opt_min_std.get_result_dataframe().iloc[1]
-        df.loc["Opt: Max Return", :] = opt_max_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Current Std Max Return", :] = opt_matching_std_highest_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Max Sharpe Ratio", :] = opt_max_sharpe_ratio.get_result_dataframe().iloc[1]
-        df = df.reset_index(level=0)
+    @staticmethod
+    def add_portfolio_weight_table(weights: DataFrame):
+        df = weights.reset_index(level=0)
         df = df.rename({'index': ''}, axis='columns')
         fig, axes = plt.subplots(1, figsize=(12, 4))
         fig.suptitle("Portfolio Weights [%]", fontsize=25)
@@ -163,80 +290,25 @@ class PortfolioAnalysisReportBuilder:
         axes.table(cellText=df.values, colLabels=df.columns, loc='center')
         return fig
 
-    def add_portfolio_weight_barplot_stock(self, current_portfolio_result: PortfolioResult,
-                                           sim_min_std: PortfolioResult,
-                                           sim_max_return: PortfolioResult,
-                                           sim_matching_std_highest_return: PortfolioResult,
-                                           opt_min_std: PortfolioResult,
-                                           opt_max_return: PortfolioResult,
-                                           opt_matching_std_highest_return: PortfolioResult,
-                                           opt_max_sharpe_ratio: PortfolioResult):
-        headers = current_portfolio_result.symbols_in_correct_order
-        df = pd.DataFrame(columns=headers,
-                          index=["Current", "Sim: Min Std", "Sim: Max Return", "Sim: Current Std Max Return", "Opt: Min Std",
-                                 "Opt: Max Return", "Opt: Current Std Max Return"])
-        df.loc["Current", :] = current_portfolio_result.get_result_dataframe().iloc[1]
-        df.loc["Sim: Min Std", :] = sim_min_std.get_result_dataframe().iloc[1]
-        df.loc["Sim: Max Return", :] = sim_max_return.get_result_dataframe().iloc[1]
-        df.loc["Sim: Current Std Max Return", :] = sim_matching_std_highest_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Min Std", :] = opt_min_std.get_result_dataframe().iloc[1]
-        df.loc["Opt: Max Return", :] = opt_max_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Current Std Max Return", :] = opt_matching_std_highest_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Max Sharpe Ratio", :] = opt_max_sharpe_ratio.get_result_dataframe().iloc[1]
+    @staticmethod
+    def add_portfolio_weight_barplot_stock(weights: DataFrame):
         fig, axes = plt.subplots(1, figsize=(12, 4))
         fig.suptitle('Portfolio Weight Bar Chart - Stocks', fontsize=16)
-        df.T.plot.bar(ax=axes)
-        plt.ylabel("Weight [%]")
+        weights.T.plot.bar(ax=axes)
+        axes.set_ylabel("Weight [%]")
         return fig
 
-    def add_portfolio_weight_barplot_portfolio(self, current_portfolio_result: PortfolioResult,
-                                               sim_min_std: PortfolioResult,
-                                               sim_max_return: PortfolioResult,
-                                               sim_matching_std_highest_return: PortfolioResult,
-                                               opt_min_std: PortfolioResult,
-                                               opt_max_return: PortfolioResult,
-                                               opt_matching_std_highest_return: PortfolioResult,
-                                               opt_max_sharpe_ratio: PortfolioResult):
-        headers = current_portfolio_result.symbols_in_correct_order
-        df = pd.DataFrame(columns=headers,
-                          index=["Current", "Sim: Min Std", "Sim: Max Return", "Sim: Current Std Max Return", "Opt: Min Std",
-                                 "Opt: Max Return", "Opt: Current Std Max Return"])
-        df.loc["Current", :] = current_portfolio_result.get_result_dataframe().iloc[1]
-        df.loc["Sim: Min Std", :] = sim_min_std.get_result_dataframe().iloc[1]
-        df.loc["Sim: Max Return", :] = sim_max_return.get_result_dataframe().iloc[1]
-        df.loc["Sim: Current Std Max Return", :] = sim_matching_std_highest_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Min Std", :] = opt_min_std.get_result_dataframe().iloc[1]
-        df.loc["Opt: Max Return", :] = opt_max_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Current Std Max Return", :] = opt_matching_std_highest_return.get_result_dataframe().iloc[1]
-        df.loc["Opt: Max Sharpe Ratio", :] = opt_max_sharpe_ratio.get_result_dataframe().iloc[1]
+    @staticmethod
+    def add_portfolio_weight_barplot_portfolio(weights: DataFrame):
         fig, axes = plt.subplots(1, figsize=(12, 4))
         fig.suptitle('Portfolio Weight Bar Chart - Portfolio', fontsize=16)
-        df.plot.bar(ax=axes)
-        plt.ylabel("Weight [%]")
+        weights.plot.bar(ax=axes)
+        axes.set_ylabel("Weight [%]")
         return fig
 
-    def add_portfolio_annualized_statistics(self, current_portfolio_result: PortfolioResult,
-                                            sim_min_std: PortfolioResult,
-                                            sim_max_return: PortfolioResult,
-                                            sim_matching_std_highest_return: PortfolioResult,
-                                            opt_min_std: PortfolioResult,
-                                            opt_max_return: PortfolioResult,
-                                            opt_matching_std_highest_return: PortfolioResult,
-                                            opt_max_sharpe_ratio: PortfolioResult):
-        headers = ["Expected Return", "Correlation Adjusted Variance", "Standard Deviation"]
-        df = pd.DataFrame(columns=headers,
-                          index=["Current", "Sim: Min Std", "Sim: Max Return", "Sim: Current Std Max Return", "Opt: Min Std",
-                                 "Opt: Max Return", "Opt: Current Std Max Return"])
-        df.loc["Current", :] = current_portfolio_result.get_result_statistics_dataframe().iloc[0]
-        df.loc["Sim: Min Std", :] = sim_min_std.get_result_statistics_dataframe().iloc[0]
-        df.loc["Sim: Max Return", :] = sim_max_return.get_result_statistics_dataframe().iloc[0]
-        df.loc["Sim: Current Std Max Return", :] = sim_matching_std_highest_return.get_result_statistics_dataframe().iloc[0]
-        df.loc["Opt: Min Std", :] = opt_min_std.get_result_statistics_dataframe().iloc[0]
-        df.loc["Opt: Max Return", :] = opt_max_return.get_result_statistics_dataframe().iloc[0]
-        df.loc["Opt: Current Std Max Return", :] = opt_matching_std_highest_return.get_result_statistics_dataframe().iloc[0]
-        df.loc["Opt: Max Sharpe Ratio", :] = opt_max_sharpe_ratio.get_result_statistics_dataframe().iloc[0]
-        df = df.T
-        df = df.reset_index(level=0)
+    @staticmethod
+    def add_portfolio_annualized_statistics(statistics: DataFrame):
+        df = statistics.reset_index(level=0)
         df = df.rename({'index': ''}, axis='columns')
         fig, axes = plt.subplots(1, figsize=(12, 4))
         fig.suptitle("Annualized Return Statistics ", fontsize=16)
@@ -245,73 +317,89 @@ class PortfolioAnalysisReportBuilder:
         axes.table(cellText=df.values, colLabels=df.columns, loc='center')
         return fig
 
-    def create_expected_return_std_plot(self, optimization_portfolio_results: [PortfolioResult],
-                                        simulated_portfolio_results: [PortfolioResult],
-                                        current_portfolio: PortfolioResult,
-                                        sim_min_std: PortfolioResult,
-                                        sim_max_return: PortfolioResult,
-                                        sim_matching_std_highest_return: PortfolioResult,
-                                        opt_min_std: PortfolioResult,
-                                        opt_max_return: PortfolioResult,
-                                        opt_matching_std_highest_return: PortfolioResult,
-                                        opt_max_sharpe_ratio: PortfolioResult):
+    @staticmethod
+    def add_risk_metrics(risk_metrics: DataFrame):
+        df = risk_metrics.reset_index(level=0)
+        df = df.rename({'index': ''}, axis='columns')
+        fig, axes = plt.subplots(1, figsize=(12, 4))
+        fig.suptitle("One Day Risk [% Loss]", fontsize=16)
+        axes.axis('tight')
+        axes.axis('off')
+        axes.table(cellText=df.values, colLabels=df.columns, loc='center')
+        return fig
+
+    @staticmethod
+    def create_expected_return_cvar_plot(optimization_expected_returns: np.array,
+                                         optimization_cvars: np.array,
+                                         simulated_expected_returns: np.array,
+                                         simulated_cvars: np.array,
+                                         label_to_expected_return_cvar: {str, (float, float)},
+                                         scatter_mode: str):
+        fig, axes = plt.subplots(1, figsize=(12, 4))
+        fig.suptitle("Annualized Expected Return Vs One Day Historical CVaR", fontsize=16)
+        if scatter_mode == "hexbin":
+            axes.hexbin(y=simulated_expected_returns, x=simulated_cvars, label="simulated", cmap="Blues", gridsize=100, bins="log", mincnt=1)
+        else:
+            axes.scatter(y=simulated_expected_returns, x=simulated_cvars, label="simulated", c="blue", s=2, alpha=0.5,
+                         rasterized=scatter_mode == "raster")
+        axes.scatter(y=optimization_expected_returns, x=optimization_cvars, label="opt: efficient-frontier", c="black", s=2, alpha=0.95)
+        for label, legend, color in [("Current", "current", "red"),
+                                     ("Sim: Min Std", "sim: min-std", "green"),
+                                     ("Sim: Max Return", "sim: max-return", "purple"),
+                                     ("Sim: Current Std Max Return", "sim: max-return-current-std", "pink"),
+                                     ("Opt: Min Std", "opt: min-std", "orange"),
+                                     ("Opt: Max Return", "opt: max-return", "brown"),
+                                     ("Opt: Current Std Max Return", "opt: max-return-current-std", "aqua"),
+                                     ("Opt: Max Sharpe Ratio", "opt: max-sharpe_ratio", "olive")]:
+            expected_return, cvar = label_to_expected_return_cvar[label]
+            axes.scatter(y=expected_return, x=cvar, label=legend, c=color, alpha=0.9, s=100)
+
+        axes.set_xlabel("Historical CVaR (1 Day Loss %)")
+        axes.set_ylabel("Expected Return")
+        axes.legend()
+        axes.grid(True)
+        return fig
+
+    @staticmethod
+    def create_expected_return_std_plot(optimization_expected_returns: np.array,
+                                        optimization_standard_deviations: np.array,
+                                        simulated_expected_returns: np.array,
+                                        simulated_standard_deviations: np.array,
+                                        label_to_expected_return_std: {str, (float, float)},
+                                        stock_expected_returns: np.array,
+                                        stock_standard_deviations: np.array,
+                                        scatter_mode: str,
+                                        standard_deviation_label: str):
         fig, axes = plt.subplots(1, figsize=(12, 4))
         fig.suptitle("Annualized Expected Return Vs Std", fontsize=16)
-        axes.scatter(y=[r.annualized_expected_returns for r in simulated_portfolio_results],
-                     x=[r.annualized_standard_deviation for r in simulated_portfolio_results], label="simulated", c="blue", s=2,
-                     alpha=[.90 * abs(r.annualized_expected_returns / sim_max_return.annualized_expected_returns) for r in
-                            simulated_portfolio_results])
-        axes.scatter(y=[r.annualized_expected_returns for r in optimization_portfolio_results],
-                     x=[r.annualized_standard_deviation for r in optimization_portfolio_results], label="opt: efficient-frontier", c="black", s=2,
+        sim_max_return: float = label_to_expected_return_std["Sim: Max Return"][0]
+        if scatter_mode == "hexbin":
+            axes.hexbin(y=simulated_expected_returns,
+                        x=simulated_standard_deviations, label="simulated", cmap="Blues", gridsize=100, bins="log", mincnt=1)
+        else:
+            axes.scatter(y=simulated_expected_returns,
+                         x=simulated_standard_deviations, label="simulated", c="blue", s=2,
+                         alpha=np.clip(.90 * np.abs(simulated_expected_returns / sim_max_return), 0, 1), rasterized=scatter_mode == "raster")
+        axes.scatter(y=optimization_expected_returns,
+                     x=optimization_standard_deviations, label="opt: efficient-frontier", c="black", s=2,
                      alpha=0.95)
-        axes.scatter(y=current_portfolio.annualized_expected_returns,
-                     x=current_portfolio.annualized_standard_deviation, label="current", c="red", alpha=0.9, s=100)
-        axes.scatter(y=sim_min_std.annualized_expected_returns,
-                     x=sim_min_std.annualized_standard_deviation, label="sim: min-std", c="green", alpha=0.9, s=100)
-        axes.scatter(y=sim_max_return.annualized_expected_returns,
-                     x=sim_max_return.annualized_standard_deviation, label="sim: max-return", c="purple", alpha=0.9, s=100)
-        axes.scatter(y=sim_matching_std_highest_return.annualized_expected_returns,
-                     x=sim_matching_std_highest_return.annualized_standard_deviation, label="sim: max-return-current-std", c="pink",
-                     alpha=0.9, s=100)
-        axes.scatter(y=opt_min_std.annualized_expected_returns,
-                     x=opt_min_std.annualized_standard_deviation, label="opt: min-std", c="orange", alpha=0.9, s=100)
-        axes.scatter(y=opt_max_return.annualized_expected_returns,
-                     x=opt_max_return.annualized_standard_deviation, label="opt: max-return", c="brown", alpha=0.9, s=100)
-        axes.scatter(y=opt_matching_std_highest_return.annualized_expected_returns,
-                     x=opt_matching_std_highest_return.annualized_standard_deviation, label="opt: max-return-current-std", c="aqua",
-                     alpha=0.9, s=100)
-        axes.scatter(y=opt_max_sharpe_ratio.annualized_expected_returns,
-                     x=opt_max_sharpe_ratio.annualized_standard_deviation, label="opt: max-sharpe_ratio", c="olive",
-                     alpha=0.9, s=100)
-        axes.scatter(y=[mean * 252 for mean in self.historical_data.mean_returns.to_numpy()],
-                     x=[np.sqrt(self.historical_data.correlation_adjusted_covariance.iloc[idx, idx] * 252)
-                        for idx in range(0, len(self.historical_data.mean_returns.to_numpy()))],
+        for label, legend, color in [("Current", "current", "red"),
+                                     ("Sim: Min Std", "sim: min-std", "green"),
+                                     ("Sim: Max Return", "sim: max-return", "purple"),
+                                     ("Sim: Current Std Max Return", "sim: max-return-current-std", "pink"),
+                                     ("Opt: Min Std", "opt: min-std", "orange"),
+                                     ("Opt: Max Return", "opt: max-return", "brown"),
+                                     ("Opt: Current Std Max Return", "opt: max-return-current-std", "aqua"),
+                                     ("Opt: Max Sharpe Ratio", "opt: max-sharpe_ratio", "olive")]:
+            expected_return, standard_deviation = label_to_expected_return_std[label]
+            axes.scatter(y=expected_return, x=standard_deviation, label=legend, c=color, alpha=0.9, s=100)
+        axes.scatter(y=stock_expected_returns,
+                     x=stock_standard_deviations,
                      label="stocks", c="yellow", alpha=0.9,
                      s=50)
 
-        plt.xlabel("Standard Deviation (Volatility)")
-        plt.ylabel("Expected Return")
+        axes.set_xlabel(f"{standard_deviation_label} (Volatility)")
+        axes.set_ylabel("Expected Return")
         axes.legend()
         axes.grid(True)
         return fig
-
-    def get_max_return_same_std(self, this_portfolio: PortfolioResult,
-                                other_portfolio_results: [PortfolioResult]):
-        min_max: PortfolioResult = other_portfolio_results[0]
-        max_return: float = -np.inf
-        for result in other_portfolio_results:
-            std_diff: float = abs(result.annualized_standard_deviation - this_portfolio.annualized_standard_deviation)
-            if std_diff < 0.01 and result.annualized_expected_returns > max_return:
-                min_max = result
-                max_return = result.annualized_expected_returns
-        return min_max
-
-    def get_max_sharpe_ratio(self, portfolio_results: [PortfolioResult]):
-        max_ratio: PortfolioResult = portfolio_results[0]
-        beat_sharpe_ratio: float = -np.inf
-        for result in portfolio_results:
-            sharpe_ratio: float = (result.annualized_expected_returns - self.risk_free_return) / result.annualized_standard_deviation
-            if sharpe_ratio > beat_sharpe_ratio:
-                max_ratio = result
-                beat_sharpe_ratio = sharpe_ratio
-        return max_ratio
@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from model.portfolio_result import PortfolioResult
+from model.portfolio_result_set import PortfolioResultSet
+
+
+class PortfolioResultExporter:
+
+    def __init__(self, symbols_in_correct_order: [str], risk_free_return: float):
+        self.symbols_in_correct_order: [str] = symbols_in_correct_order
+        self.risk_free_return: float = risk_free_return
+
+    def export(self, output_path: str, output_format: str, label_to_portfolio_result: {str, PortfolioResult},
+               optimization_portfolio_results: PortfolioResultSet, risk_metrics: {str, DataFrame} = None):
+        if output_format == "csv":
+            self.create_results_dataframe(label_to_portfolio_result, optimization_portfolio_results, risk_metrics).to_csv(output_path)
+        else:
+            with open(output_path, "w") as file:
+                json.dump(self.create_results_dict(label_to_portfolio_result, optimization_portfolio_results, risk_metrics), file, indent=2)
+        print(f"Results saved: {output_path}")
+
+    def create_results_dict(self, label_to_portfolio_result: {str, PortfolioResult},
+                            optimization_portfolio_results: PortfolioResultSet, risk_metrics: {str, DataFrame} = None) -> dict:
+        portfolio_risk: [dict] = self.create_risk_dicts(risk_metrics, "portfolios", len(label_to_portfolio_result))
+        frontier_risk: [dict] = self.create_risk_dicts(risk_metrics, "efficient_frontier", len(optimization_portfolio_results))
+        return {
+            "symbols": self.symbols_in_correct_order,
+            "risk_free_return": self.risk_free_return,
+            "portfolios": {label: self.create_portfolio_dict(result.annualized_expected_returns, result.annualized_standard_deviation,
+                                                             result.weights, risk)
+                           for (label, result), risk in zip(label_to_portfolio_result.items(), portfolio_risk)},
+            "efficient_frontier": [self.create_portfolio_dict(expected_return, standard_deviation, weights, risk)
+                                   for expected_return, standard_deviation, weights, risk in
+                                   zip(optimization_portfolio_results.annualized_expected_returns,
+                                       optimization_portfolio_results.annualized_standard_deviations,
+                                       optimization_portfolio_results.weights, frontier_risk)],
+        }
+
+    def create_portfolio_dict(self, expected_return: float, standard_deviation: float, weights: np.array, risk: dict = None) -> dict:
+        portfolio: dict = {
+            "expected_return": float(expected_return),
+            "standard_deviation": float(standard_deviation),
+            "sharpe_ratio": float((expected_return - self.risk_free_return) / standard_deviation),
+            "weights": dict(zip(self.symbols_in_correct_order, weights.tolist())),
+        }
+        if risk is not None:
+            portfolio["risk"] = risk
+        return portfolio
+
+    @staticmethod
+    def create_risk_dicts(risk_metrics: {str, DataFrame}, name: str, nr_of_portfolios: int) -> [dict]:
+        if risk_metrics is None:
+            return [None] * nr_of_portfolios
+        return risk_metrics[name].to_dict(orient="records")
+
+    def create_results_dataframe(self, label_to_portfolio_result: {str, PortfolioResult},
+                                 optimization_portfolio_results: PortfolioResultSet, risk_metrics: {str, DataFrame} = None) -> DataFrame:
+        labels: [str] = list(label_to_portfolio_result.keys()) + [f"Frontier {i}" for i in range(len(optimization_portfolio_results))]
+        expected_returns: np.array = np.concatenate([[result.annualized_expected_returns for result in label_to_portfolio_result.values()],
+                                                     optimization_portfolio_results.annualized_expected_returns])
+        standard_deviations: np.array = np.concatenate([[result.annualized_standard_deviation
+                                                         for result in label_to_portfolio_result.values()],
+                                                        optimization_portfolio_results.annualized_standard_deviations])
+        weights: np.array = np.vstack([[result.weights for result in label_to_portfolio_result.values()],
+                                       optimization_portfolio_results.weights])
+        results: DataFrame = pd.DataFrame({"Expected Return": expected_returns,
+                                           "Standard Deviation": standard_deviations,
+                                           "Sharpe Ratio": (expected_returns - self.risk_free_return) / standard_deviations},
+                                          index=pd.Index(labels, name="Portfolio"))
+        if risk_metrics is not None:
+            risk: DataFrame = pd.concat([risk_metrics["portfolios"], risk_metrics["efficient_frontier"]], ignore_index=True)
+            results = pd.concat([results, risk.set_index(results.index)], axis=1)
+        return pd.concat([results, pd.DataFrame(weights, index=results.index, columns=self.symbols_in_correct_order)], axis=1)
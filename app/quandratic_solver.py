@@ -1,13 +1,180 @@
+import warnings
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
 import numpy as np
-from scipy import optimize
+from scipy import linalg, optimize
+from scipy.optimize import OptimizeResult
+
+from risk_model.risk_model import RiskModel
+
+
+class QuadraticSolverBackend(ABC):
+
+    @abstractmethod
+    def solve_frontier_point(self, H: RiskModel, mean_returns: np.array, expected_return: float, x0: np.array) -> OptimizeResult:
+        pass
+
+    @staticmethod
+    def calculate_objective(H: RiskModel, x: np.array) -> float:
+        return 0.5 * x.dot(H.dot(x))
+
+
+class SlsqpBackend(QuadraticSolverBackend):
+
+    def solve_frontier_point(self, H: RiskModel, mean_returns: np.array, expected_return: float, x0: np.array) -> OptimizeResult:
+        nr_of_symbols: int = len(mean_returns)
+        A: np.array = np.array([mean_returns, np.ones(nr_of_symbols)])
+        b: np.array = np.array([expected_return, 1])
+        constraints: [{}] = [{'type': 'eq',
+                              'fun': lambda x: np.dot(A, x) - b,
+                              'jac': lambda x: A}]
+        bounds: [()] = [(0, None)] * nr_of_symbols
+        return QuadraticSolver.solve(H, np.zeros(nr_of_symbols), np.zeros(nr_of_symbols), x0, constraints, bounds)
+
+
+# Primal active-set solver for min 0.5 x'Hx s.t. mean_returns'x = expected_return, sum(x) = 1, x >= 0. The KKT matrix of a
+# free set does not depend on the target return, so its factorization is cached and reused across frontier points.
+class ActiveSetBackend(QuadraticSolverBackend):
+
+    def __init__(self, tolerance: float = 1e-10, max_iterations: int = None, cache_size: int = 256):
+        self.tolerance: float = tolerance
+        self.max_iterations: int = max_iterations
+        self.cache_size: int = cache_size
+        self.H: RiskModel = None
+        self.mean_returns: np.array = None
+        self.free_set_to_factorization: OrderedDict = OrderedDict()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["H"], state["mean_returns"], state["free_set_to_factorization"] = None, None, OrderedDict()
+        return state
+
+    def solve_frontier_point(self, H: RiskModel, mean_returns: np.array, expected_return: float, x0: np.array) -> OptimizeResult:
+        if H is not self.H or mean_returns is not self.mean_returns:
+            self.H, self.mean_returns = H, mean_returns
+            self.free_set_to_factorization.clear()
 
+        nr_of_symbols: int = len(mean_returns)
+        A: np.array = np.array([mean_returns, np.ones(nr_of_symbols)])
+        b: np.array = np.array([expected_return, 1])
+        x: np.array = self.create_feasible_start(mean_returns, expected_return, x0)
+        if x is None:
+            return OptimizeResult(x=x0, success=False, nit=0, message="Expected return is not attainable with long only weights")
 
+        tolerance: float = self.tolerance * max(1.0, H.diagonal().max())
+        working_set: np.array = x <= 0
+        max_iterations: int = self.max_iterations or 10 * nr_of_symbols
+        for iteration in range(1, max_iterations + 1):
+            free: np.array = ~working_set
+            y, nu = self.solve_kkt_system(H, A, b, free)
+            if (y >= -self.tolerance).all():
+                x[free] = np.maximum(y, 0)
+                if not working_set.any():
+                    return OptimizeResult(x=x, success=True, nit=iteration, message="Optimization terminated successfully")
+                multipliers: np.array = H.dot(x)[working_set] + A[:, working_set].T.dot(nu)
+                if multipliers.min() >= -tolerance:
+                    return OptimizeResult(x=x, success=True, nit=iteration, message="Optimization terminated successfully")
+                working_set[np.flatnonzero(working_set)[np.argmin(multipliers)]] = False
+            else:
+                step: np.array = y - x[free]
+                decreasing: np.array = step < 0
+                step_lengths: np.array = np.full(len(step), np.inf)
+                step_lengths[decreasing] = x[free][decreasing] / -step[decreasing]
+                blocking: int = int(np.argmin(step_lengths))
+                x[free] = np.maximum(x[free] + step_lengths[blocking] * step, 0)
+                blocking_symbol: int = np.flatnonzero(free)[blocking]
+                x[blocking_symbol] = 0
+                working_set[blocking_symbol] = True
+
+        return OptimizeResult(x=x, success=False, nit=max_iterations, message="Iteration limit reached")
+
+    def create_feasible_start(self, mean_returns: np.array, expected_return: float, x0: np.array) -> np.array:
+        min_index, max_index = int(np.argmin(mean_returns)), int(np.argmax(mean_returns))
+        min_return, max_return = mean_returns[min_index], mean_returns[max_index]
+        if not min_return - self.tolerance <= expected_return <= max_return + self.tolerance:
+            return None
+
+        x: np.array = np.maximum(x0, 0)
+        x = x / x.sum() if x.sum() > 0 else np.full(len(x0), 1 / len(x0))
+        start_return: float = mean_returns.dot(x)
+        # Mix the start with the single asset vertex on the far side of the target to land exactly on the target return.
+        vertex_index, vertex_return = (max_index, max_return) if expected_return > start_return else (min_index, min_return)
+        if abs(vertex_return - start_return) <= self.tolerance:
+            x = np.zeros(len(x0))
+            if max_return - min_return <= self.tolerance:
+                x[min_index] = 1
+                return x
+            share: float = np.clip((expected_return - min_return) / (max_return - min_return), 0, 1)
+            x[min_index], x[max_index] = 1 - share, share
+            return x
+        share: float = np.clip((expected_return - start_return) / (vertex_return - start_return), 0, 1)
+        x *= 1 - share
+        x[vertex_index] += share
+        return x
+
+    def solve_kkt_system(self, H: RiskModel, A: np.array, b: np.array, free: np.array) -> (np.array, np.array):
+        nr_of_free: int = int(free.sum())
+        rhs: np.array = np.concatenate([np.zeros(nr_of_free), b])
+        factorization = self.get_kkt_factorization(H, A, free)
+        solution: np.array = linalg.lu_solve(factorization, rhs, check_finite=False) if isinstance(factorization, tuple) \
+            else factorization.dot(rhs)
+        return solution[:nr_of_free], solution[nr_of_free:]
+
+    def get_kkt_factorization(self, H: RiskModel, A: np.array, free: np.array):
+        key: bytes = np.packbits(free).tobytes()
+        if key in self.free_set_to_factorization:
+            self.free_set_to_factorization.move_to_end(key)
+            return self.free_set_to_factorization[key]
+
+        nr_of_free: int = int(free.sum())
+        K: np.array = np.zeros((nr_of_free + len(A), nr_of_free + len(A)))
+        K[:nr_of_free, :nr_of_free] = H.submatrix(np.flatnonzero(free))
+        K[:nr_of_free, nr_of_free:] = A[:, free].T
+        K[nr_of_free:, :nr_of_free] = A[:, free]
+        with warnings.catch_warnings():
+            # A singular KKT matrix is expected when the free equality rows are dependent, it is handled by the pinv below.
+            warnings.simplefilter("ignore", linalg.LinAlgWarning)
+            factorization = linalg.lu_factor(K, check_finite=False)
+        pivots: np.array = np.abs(np.diag(factorization[0]))
+        if pivots.min() <= 1e-12 * max(pivots.max(), 1.0):
+            factorization = np.linalg.pinv(K)
+
+        self.free_set_to_factorization[key] = factorization
+        if len(self.free_set_to_factorization) > self.cache_size:
+            self.free_set_to_factorization.popitem(last=False)
+        return factorization
+
+
+# The fallback is the other kind of backend by default, so a failed solve is retried with another method and the backends can
+# be checked against each other.
 class QuadraticSolver:
 
-    def solve(H: np.array, c: np.array, c0: np.array, x0: np.array, constraints: [{}], bounds: [], options: {} = {},
+    def __init__(self, backend: QuadraticSolverBackend = None, fallback_backend: QuadraticSolverBackend = None):
+        self.backend: QuadraticSolverBackend = backend if backend is not None else ActiveSetBackend()
+        if fallback_backend is None:
+            fallback_backend = ActiveSetBackend() if isinstance(self.backend, SlsqpBackend) else SlsqpBackend()
+        self.fallback_backend: QuadraticSolverBackend = fallback_backend
+
+    def solve_frontier_point(self, H: RiskModel, mean_returns: np.array, expected_return: float, x0: np.array) -> OptimizeResult:
+        result: OptimizeResult = self.backend.solve_frontier_point(H, mean_returns, expected_return, x0)
+        if not result.success and type(self.fallback_backend) is not type(self.backend):
+            result = self.fallback_backend.solve_frontier_point(H, mean_returns, expected_return, x0)
+        return result
+
+    def check_backends_agree(self, H: RiskModel, mean_returns: np.array, expected_return: float, x0: np.array,
+                             tolerance: float = 1e-4) -> bool:
+        result: OptimizeResult = self.backend.solve_frontier_point(H, mean_returns, expected_return, x0)
+        fallback_result: OptimizeResult = self.fallback_backend.solve_frontier_point(H, mean_returns, expected_return, x0)
+        objective: float = QuadraticSolverBackend.calculate_objective(H, result["x"])
+        fallback_objective: float = QuadraticSolverBackend.calculate_objective(H, fallback_result["x"])
+        return abs(objective - fallback_objective) <= tolerance * max(1.0, abs(fallback_objective))
+
+    @staticmethod
+    def solve(H: RiskModel, c: np.array, c0: np.array, x0: np.array, constraints: [{}], bounds: [], options: {} = {},
               sign: float = 1.0):
-        loss: (np.array, float) = lambda x: sign * (0.5 * np.dot(x.T, np.dot(H, x)) + np.dot(c, x) + c0.dot(np.ones(len(c0)).T))
-        jacobian: (np.array, float) = lambda x: sign * (np.dot(x.T, H) + c.dot(np.ones(len(c)).T))
+        loss: (np.array, float) = lambda x: sign * (0.5 * np.dot(x.T, H.dot(x)) + np.dot(c, x) + c0.dot(np.ones(len(c0)).T))
+        jacobian: (np.array, float) = lambda x: sign * (H.dot(x) + c.dot(np.ones(len(c)).T))
         result = optimize.minimize(loss, jac=jacobian, constraints=constraints, bounds=bounds,
                                    method='SLSQP', options=options, x0=x0)
         return result
@@ -0,0 +1,6 @@
+# Kept apart from the report builder so the command line can list the choices without importing matplotlib and seaborn.
+class ReportOptions:
+    report_pages: [str] = ["mean", "covariance", "correlation", "expected-return-std", "statistics", "weight-barplot-portfolio",
+                           "weight-barplot-stock", "weight-table", "portfolio-data", "risk", "expected-return-cvar"]
+    scatter_modes: [str] = ["points", "raster", "hexbin"]
+    output_formats: [str] = ["json", "csv"]
@@ -0,0 +1,121 @@
+import copy
+
+import numpy as np
+from pandas import DataFrame, Series
+
+
+class ReturnStatistics:
+
+    def __init__(self, returns: DataFrame):
+        returns = returns.dropna(how="all")
+        symbols: [str] = returns.columns.values.tolist()
+        if returns.isna().values.any():
+            # Gaps in the history need pandas' pairwise complete observations, each matrix is still computed only once.
+            self.covariance_array: np.array = np.ascontiguousarray(returns.cov().to_numpy(), dtype=np.float64)
+            self.correlation_array: np.array = np.ascontiguousarray(returns.corr().to_numpy(), dtype=np.float64)
+            self.mean_returns_array: np.array = returns.mean().to_numpy(dtype=np.float64)
+        else:
+            values: np.array = returns.to_numpy(dtype=np.float64)
+            self.mean_returns_array: np.array = values.mean(axis=0)
+            centered_returns: np.array = values - self.mean_returns_array
+            self.covariance_array: np.array = centered_returns.T.dot(centered_returns) / (len(values) - 1)
+            standard_deviations: np.array = np.sqrt(np.diag(self.covariance_array))
+            self.correlation_array: np.array = self.covariance_array / np.outer(standard_deviations, standard_deviations)
+        self.correlation_adjusted_covariance_array: np.array = self.covariance_array * self.correlation_array
+        self.create_frames(symbols)
+
+    # Same statistics from a returns matrix, e.g. memory-mapped, that is only read in column blocks so it never has to fit in memory.
+    @classmethod
+    def from_blocks(cls, returns: np.array, symbols: [str], block_size: int = 256) -> 'ReturnStatistics':
+        blocks: [slice] = [slice(start, min(start + block_size, len(symbols))) for start in range(0, len(symbols), block_size)]
+        has_values: np.array = np.zeros(len(returns), dtype=bool)
+        for block in blocks:
+            has_values |= ~np.isnan(returns[:, block]).all(axis=1)
+        rows: np.array = np.flatnonzero(has_values)
+        has_gaps: bool = any(np.isnan(returns[rows, block]).any() for block in blocks)
+
+        statistics: ReturnStatistics = cls.__new__(cls)
+        statistics.mean_returns_array = np.concatenate([np.nanmean(returns[rows, block], axis=0) for block in blocks])
+        statistics.covariance_array = np.empty((len(symbols), len(symbols)))
+        statistics.correlation_array = np.empty((len(symbols), len(symbols)))
+        for i, row_block in enumerate(blocks):
+            row_returns: np.array = returns[rows, row_block]
+            for column_block in blocks[i:]:
+                column_returns: np.array = row_returns if column_block == row_block else returns[rows, column_block]
+                if has_gaps:
+                    # Pandas' pairwise complete observations of the two blocks give the same entries as on the full matrix.
+                    block_returns: DataFrame = DataFrame(np.hstack([row_returns, column_returns]))
+                    covariance: np.array = block_returns.cov().to_numpy()[:row_returns.shape[1], row_returns.shape[1]:]
+                    correlation: np.array = block_returns.corr().to_numpy()[:row_returns.shape[1], row_returns.shape[1]:]
+                else:
+                    covariance: np.array = (row_returns - statistics.mean_returns_array[row_block]).T.dot(
+                        column_returns - statistics.mean_returns_array[column_block]) / (len(rows) - 1)
+                    correlation: np.array = None
+                statistics.covariance_array[row_block, column_block] = covariance
+                statistics.covariance_array[column_block, row_block] = covariance.T
+                if correlation is not None:
+                    statistics.correlation_array[row_block, column_block] = correlation
+                    statistics.correlation_array[column_block, row_block] = correlation.T
+        if not has_gaps:
+            standard_deviations: np.array = np.sqrt(np.diag(statistics.covariance_array))
+            np.divide(statistics.covariance_array, standard_deviations[:, None], out=statistics.correlation_array)
+            statistics.correlation_array /= standard_deviations
+        statistics.correlation_adjusted_covariance_array = statistics.covariance_array * statistics.correlation_array
+        statistics.create_frames(symbols)
+        return statistics
+
+    def select(self, symbols: [str]) -> 'ReturnStatistics':
+        positions: np.array = self.mean_returns.index.get_indexer(symbols)
+        selection: ReturnStatistics = copy.copy(self)
+        selection.mean_returns_array = self.mean_returns_array[positions]
+        selection.covariance_array = self.covariance_array[np.ix_(positions, positions)]
+        selection.correlation_array = self.correlation_array[np.ix_(positions, positions)]
+        selection.correlation_adjusted_covariance_array = self.correlation_adjusted_covariance_array[np.ix_(positions, positions)]
+        selection.create_frames(symbols)
+        return selection
+
+    def create_frames(self, symbols: [str]):
+        self.mean_returns: Series = Series(self.mean_returns_array, index=symbols)
+        self.covariance: DataFrame = DataFrame(self.covariance_array, index=symbols, columns=symbols, copy=False)
+        self.correlation: DataFrame = DataFrame(self.correlation_array, index=symbols, columns=symbols, copy=False)
+        self.correlation_adjusted_covariance: DataFrame = DataFrame(self.correlation_adjusted_covariance_array, index=symbols,
+                                                                    columns=symbols, copy=False)
+
+
+# Mean and covariance of a sliding window of returns that is updated one day at a time in O(k^2) instead of O(T k^2).
+class RollingReturnStatistics:
+
+    def __init__(self, initial_returns: np.array):
+        # Accumulating around the initial mean limits the cancellation in the covariance formula as the window slides.
+        self.shift: np.array = initial_returns.mean(axis=0)
+        shifted_returns: np.array = initial_returns - self.shift
+        self.nr_of_observations: int = len(initial_returns)
+        self.sum: np.array = shifted_returns.sum(axis=0)
+        self.cross_product_sum: np.array = shifted_returns.T.dot(shifted_returns)
+
+    def add(self, returns: np.array):
+        shifted_returns: np.array = returns - self.shift
+        self.nr_of_observations += 1
+        self.sum += shifted_returns
+        self.cross_product_sum += np.outer(shifted_returns, shifted_returns)
+
+    def drop(self, returns: np.array):
+        shifted_returns: np.array = returns - self.shift
+        self.nr_of_observations -= 1
+        self.sum -= shifted_returns
+        self.cross_product_sum -= np.outer(shifted_returns, shifted_returns)
+
+    @property
+    def mean_returns_array(self) -> np.array:
+        return self.shift + self.sum / self.nr_of_observations
+
+    @property
+    def covariance_array(self) -> np.array:
+        shifted_mean: np.array = self.sum / self.nr_of_observations
+        return (self.cross_product_sum - self.nr_of_observations * np.outer(shifted_mean, shifted_mean)) / (self.nr_of_observations - 1)
+
+    @property
+    def correlation_adjusted_covariance_array(self) -> np.array:
+        covariance: np.array = self.covariance_array
+        standard_deviations: np.array = np.sqrt(np.diag(covariance))
+        return covariance * (covariance / np.outer(standard_deviations, standard_deviations))
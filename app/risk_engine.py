@@ -0,0 +1,77 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+
+# One day tail risk of a batch of portfolios from the daily returns matrix. The portfolio returns of a chunk of weight vectors
+# are accumulated from (b, k) x (k, n) products over blocks of b days and the tail is found with a partial sort, so no per
+# portfolio pandas calls are made. The returns are never copied as a whole, memory-mapped returns are read a block at a time.
+# All metrics are losses in % of the portfolio value, stress scenario P&L is a gain in % for shocks given in %.
+class RiskEngine:
+
+    def __init__(self, returns: DataFrame, confidence_level: float = 0.95, stress_scenarios: DataFrame = None, chunk_size: int = 4096,
+                 block_size: int = None):
+        self.symbols: [str] = returns.columns.values.tolist()
+        self.returns_array: np.array = returns.to_numpy(dtype=np.float64, copy=False)
+        self.block_size: int = block_size if block_size is not None else max(1, 2 ** 20 // max(len(self.symbols), 1))
+        # Days where any symbol has no return are left out, like the dropped first row of the price changes.
+        self.complete_days: np.array = np.concatenate(
+            [~np.isnan(self.returns_array[start:start + self.block_size]).any(axis=1)
+             for start in range(0, len(self.returns_array), self.block_size)]) if len(self.returns_array) > 0 else np.empty(0, dtype=bool)
+        self.confidence_level: float = confidence_level
+        self.stress_scenarios: DataFrame = stress_scenarios.reindex(columns=self.symbols).fillna(0.0) if stress_scenarios is not None \
+            else DataFrame(columns=self.symbols, dtype=np.float64)
+        self.chunk_size: int = chunk_size
+        self.nr_of_observations: int = int(self.complete_days.sum())
+        self.nr_of_tail_observations: int = min(max(int(np.ceil((1 - confidence_level) * self.nr_of_observations)), 1),
+                                                self.nr_of_observations)
+
+    # Stress scenarios csv with the header Scenario,Symbol,Shock where the shock is the return in %, symbols left out are not shocked.
+    @staticmethod
+    def read_stress_scenarios(stress_scenarios_file_path: str) -> DataFrame:
+        shocks: DataFrame = pd.read_csv(stress_scenarios_file_path, skipinitialspace=True)
+        shocks.columns = ["Scenario", "Symbol", "Shock"]
+        shocks["Symbol"] = shocks["Symbol"].astype(str).str.strip()
+        return shocks.pivot_table(index="Scenario", columns="Symbol", values="Shock", aggfunc="sum", sort=False)
+
+    def get_metric_names(self) -> [str]:
+        return ["Historical VaR", "Historical CVaR", "Parametric VaR", "Parametric CVaR", "Max Drawdown"] + \
+            [f"Stress: {scenario}" for scenario in self.stress_scenarios.index]
+
+    def calculate(self, weights: np.array) -> DataFrame:
+        weights = np.atleast_2d(weights)
+        metrics: np.array = np.vstack([self.calculate_chunk(weights[start:start + self.chunk_size])
+                                       for start in range(0, len(weights), self.chunk_size)]) if len(weights) > 0 \
+            else np.empty((0, len(self.get_metric_names())))
+        return DataFrame(metrics, columns=self.get_metric_names())
+
+    def calculate_portfolio_returns(self, weights: np.array) -> np.array:
+        portfolio_returns: np.array = np.empty((len(weights), self.nr_of_observations), dtype=np.float64)
+        day: int = 0
+        for start in range(0, len(self.returns_array), self.block_size):
+            block: np.array = self.returns_array[start:start + self.block_size][self.complete_days[start:start + self.block_size]]
+            portfolio_returns[:, day:day + len(block)] = block.dot(weights.T).T
+            day += len(block)
+        return portfolio_returns
+
+    def calculate_chunk(self, weights: np.array) -> np.array:
+        portfolio_returns: np.array = self.calculate_portfolio_returns(weights)
+        tail: int = self.nr_of_tail_observations
+        worst_returns: np.array = np.partition(portfolio_returns, tail - 1, axis=1)[:, :tail]
+        historical_var: np.array = -worst_returns.max(axis=1)
+        historical_cvar: np.array = -worst_returns.mean(axis=1)
+
+        means: np.array = portfolio_returns.mean(axis=1)
+        standard_deviations: np.array = portfolio_returns.std(axis=1, ddof=1)
+        # The standard library normal distribution, scipy.stats alone would add a third of a second to every start up.
+        z: float = NormalDist().inv_cdf(1 - self.confidence_level)
+        parametric_var: np.array = -(means + z * standard_deviations)
+        parametric_cvar: np.array = -(means - standard_deviations * NormalDist().pdf(z) / (1 - self.confidence_level))
+
+        wealth: np.array = np.cumprod(1 + portfolio_returns / 100, axis=1)
+        max_drawdown: np.array = (1 - wealth / np.maximum.accumulate(np.maximum(wealth, 1), axis=1)).max(axis=1) * 100
+
+        stress_pnl: np.array = weights.dot(self.stress_scenarios.to_numpy(dtype=np.float64).T)
+        return np.column_stack([historical_var, historical_cvar, parametric_var, parametric_cvar, max_drawdown, stress_pnl])
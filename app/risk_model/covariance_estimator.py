@@ -0,0 +1,21 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+from pandas import DataFrame
+
+from return_statistics import ReturnStatistics
+from risk_model.risk_model import RiskModel
+
+
+# The labels name what the risk model measures, only the sample estimator gives the correlation adjusted variance.
+class CovarianceEstimator(ABC):
+    variance_label: str = "Variance"
+    standard_deviation_label: str = "Standard Deviation"
+
+    @abstractmethod
+    def estimate(self, returns: DataFrame, statistics: ReturnStatistics) -> RiskModel:
+        pass
+
+    @staticmethod
+    def get_complete_returns(returns: DataFrame) -> np.array:
+        return returns.dropna().to_numpy(dtype=np.float64)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from risk_model.risk_model import RiskModel
+
+
+class DenseRiskModel(RiskModel):
+
+    def __init__(self, matrix: np.array):
+        self.matrix: np.array = matrix
+
+    def dot(self, weights: np.array) -> np.array:
+        return weights.dot(self.matrix)
+
+    def diagonal(self) -> np.array:
+        return np.diag(self.matrix).copy()
+
+    def submatrix(self, indices: np.array) -> np.array:
+        return self.matrix[np.ix_(indices, indices)]
+
+    def select(self, indices: np.array) -> RiskModel:
+        return DenseRiskModel(self.submatrix(indices))
+
+    def to_dense(self) -> np.array:
+        return self.matrix
@@ -0,0 +1,25 @@
+import numpy as np
+from pandas import DataFrame
+
+from return_statistics import ReturnStatistics
+from risk_model.covariance_estimator import CovarianceEstimator
+from risk_model.dense_risk_model import DenseRiskModel
+from risk_model.risk_model import RiskModel
+
+
+# Exponentially weighted covariance where the weight of a day decays by the given factor per day, 0.94 as in RiskMetrics.
+class EwmaCovarianceEstimator(CovarianceEstimator):
+    variance_label: str = "EWMA Variance"
+    standard_deviation_label: str = "EWMA Standard Deviation"
+
+    def __init__(self, decay: float = 0.94):
+        self.decay: float = decay
+
+    def estimate(self, returns: DataFrame, statistics: ReturnStatistics) -> RiskModel:
+        values: np.array = self.get_complete_returns(returns)
+        weights: np.array = self.decay ** np.arange(len(values) - 1, -1, -1, dtype=np.float64)
+        weights /= weights.sum()
+        centered_returns: np.array = values - weights.dot(values)
+        # Dividing by 1 - sum(w^2) makes the weighted estimate unbiased, as n - 1 does for equal weights.
+        covariance: np.array = (centered_returns * weights[:, None]).T.dot(centered_returns) / (1 - weights.dot(weights))
+        return DenseRiskModel(covariance)
@@ -0,0 +1,29 @@
+import numpy as np
+
+from risk_model.risk_model import RiskModel
+
+
+# H = B F B' + D with k x f loadings B, f x f factor covariance F and diagonal specific variances D. Products with weights cost
+# O(k f) per portfolio and the model is stored in O(k f).
+class FactorRiskModel(RiskModel):
+
+    def __init__(self, factor_loadings: np.array, factor_covariance: np.array, specific_variances: np.array):
+        self.factor_loadings: np.array = factor_loadings
+        self.factor_covariance: np.array = factor_covariance
+        self.specific_variances: np.array = specific_variances
+
+    def dot(self, weights: np.array) -> np.array:
+        return weights.dot(self.factor_loadings).dot(self.factor_covariance).dot(self.factor_loadings.T) + weights * self.specific_variances
+
+    def diagonal(self) -> np.array:
+        return np.einsum('ij,jk,ik->i', self.factor_loadings, self.factor_covariance, self.factor_loadings) + self.specific_variances
+
+    def submatrix(self, indices: np.array) -> np.array:
+        factor_loadings: np.array = self.factor_loadings[indices]
+        return factor_loadings.dot(self.factor_covariance).dot(factor_loadings.T) + np.diag(self.specific_variances[indices])
+
+    def select(self, indices: np.array) -> RiskModel:
+        return FactorRiskModel(self.factor_loadings[indices], self.factor_covariance, self.specific_variances[indices])
+
+    def to_dense(self) -> np.array:
+        return self.submatrix(np.arange(len(self.specific_variances)))
@@ -0,0 +1,28 @@
+import numpy as np
+from pandas import DataFrame
+
+from return_statistics import ReturnStatistics
+from risk_model.covariance_estimator import CovarianceEstimator
+from risk_model.dense_risk_model import DenseRiskModel
+from risk_model.risk_model import RiskModel
+
+
+# Ledoit and Wolf (2004) shrinkage of the sample covariance towards a scaled identity with the optimal shrinkage intensity.
+class LedoitWolfEstimator(CovarianceEstimator):
+    variance_label: str = "Ledoit-Wolf Variance"
+    standard_deviation_label: str = "Ledoit-Wolf Standard Deviation"
+
+    def estimate(self, returns: DataFrame, statistics: ReturnStatistics) -> RiskModel:
+        values: np.array = self.get_complete_returns(returns)
+        centered_returns: np.array = values - values.mean(axis=0)
+        nr_of_observations, nr_of_symbols = centered_returns.shape
+        sample_covariance: np.array = centered_returns.T.dot(centered_returns) / nr_of_observations
+        scale: float = np.trace(sample_covariance) / nr_of_symbols
+        squared_returns: np.array = centered_returns ** 2
+        distance: float = ((sample_covariance ** 2).sum() - 2 * scale * np.trace(sample_covariance) + nr_of_symbols * scale ** 2) / nr_of_symbols
+        squared_norm_sum: float = squared_returns.T.dot(squared_returns).sum() / nr_of_observations
+        sampling_error: float = min((squared_norm_sum - (sample_covariance ** 2).sum()) / (nr_of_symbols * nr_of_observations), distance)
+        shrinkage: float = sampling_error / distance if distance > 0 else 0.0
+        covariance: np.array = (1 - shrinkage) * sample_covariance
+        covariance[np.diag_indices(nr_of_symbols)] += shrinkage * scale
+        return DenseRiskModel(covariance)
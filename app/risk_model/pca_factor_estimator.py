@@ -0,0 +1,27 @@
+import numpy as np
+from pandas import DataFrame
+
+from return_statistics import ReturnStatistics
+from risk_model.covariance_estimator import CovarianceEstimator
+from risk_model.factor_risk_model import FactorRiskModel
+from risk_model.risk_model import RiskModel
+
+
+# Statistical factor model from the leading principal components of the returns. The specific variances keep the diagonal of
+# the sample covariance, so every asset keeps its own variance.
+class PcaFactorEstimator(CovarianceEstimator):
+    variance_label: str = "PCA Factor Variance"
+    standard_deviation_label: str = "PCA Factor Standard Deviation"
+
+    def __init__(self, nr_of_factors: int = 5):
+        self.nr_of_factors: int = nr_of_factors
+
+    def estimate(self, returns: DataFrame, statistics: ReturnStatistics) -> RiskModel:
+        values: np.array = self.get_complete_returns(returns)
+        centered_returns: np.array = (values - values.mean(axis=0)) / np.sqrt(len(values) - 1)
+        _, singular_values, components = np.linalg.svd(centered_returns, full_matrices=False)
+        nr_of_factors: int = min(self.nr_of_factors, len(singular_values))
+        factor_loadings: np.array = components[:nr_of_factors].T * singular_values[:nr_of_factors]
+        variances: np.array = (centered_returns ** 2).sum(axis=0)
+        specific_variances: np.array = np.maximum(variances - (factor_loadings ** 2).sum(axis=1), 1e-6 * variances)
+        return FactorRiskModel(factor_loadings, np.eye(nr_of_factors), specific_variances)
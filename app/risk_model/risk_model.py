@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+# Symmetric risk matrix H of the portfolio variance w'Hw. Implementations only have to expose products with weights, so a
+# factor model never has to be expanded into its k x k matrix.
+class RiskModel(ABC):
+
+    @abstractmethod
+    def dot(self, weights: np.array) -> np.array:
+        pass
+
+    @abstractmethod
+    def diagonal(self) -> np.array:
+        pass
+
+    @abstractmethod
+    def submatrix(self, indices: np.array) -> np.array:
+        pass
+
+    @abstractmethod
+    def select(self, indices: np.array) -> 'RiskModel':
+        pass
+
+    @abstractmethod
+    def to_dense(self) -> np.array:
+        pass
+
+    def variances(self, weights: np.array) -> np.array:
+        return np.einsum('...i,...i->...', self.dot(weights), weights)
@@ -0,0 +1,15 @@
+from pandas import DataFrame
+
+from return_statistics import ReturnStatistics
+from risk_model.covariance_estimator import CovarianceEstimator
+from risk_model.dense_risk_model import DenseRiskModel
+from risk_model.risk_model import RiskModel
+
+
+# The correlation adjusted sample covariance, cov * corr element-wise, that the analysis has always used.
+class SampleCovarianceEstimator(CovarianceEstimator):
+    variance_label: str = "Correlation Adjusted Variance"
+    standard_deviation_label: str = "Correlation Adjusted Standard Deviation"
+
+    def estimate(self, returns: DataFrame, statistics: ReturnStatistics) -> RiskModel:
+        return DenseRiskModel(statistics.correlation_adjusted_covariance_array)
@@ -0,0 +1,104 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Collects wall time and RSS per pipeline stage plus named counters and series, saved as a json run profile.
+# One stage can additionally be run under cProfile.
+class RunProfiler:
+
+    def __init__(self, cprofile_stage: str = None, cprofile_output_path: str = None):
+        self.cprofile_stage: str = cprofile_stage
+        self.cprofile_output_path: str = cprofile_output_path
+        self.stage_to_measurement: {str, {}} = {}
+        self.counter_to_value: {str, float} = {}
+        self.series_to_values: {str, [float]} = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        profile: cProfile.Profile = cProfile.Profile() if name == self.cprofile_stage else None
+        if profile is not None:
+            profile.enable()
+        memory_before: (float, float) = RunProfiler.get_memory_mb()
+        start_time: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time: float = time.perf_counter() - start_time
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self.cprofile_output_path if self.cprofile_output_path else f"{name}.prof")
+            self.record(name, wall_time, memory_before, RunProfiler.get_memory_mb())
+
+    # A stage entered several times adds up its wall time and peak RSS increase. The RSS is the current one before the first and
+    # after the last call, the peak RSS increase is how far the stage raised the high-water mark of the process.
+    def record(self, name: str, wall_time: float, memory_before: (float, float), memory_after: (float, float)):
+        (rss_before_mb, peak_rss_before_mb), (rss_after_mb, peak_rss_after_mb) = memory_before, memory_after
+        measurement: {} = self.stage_to_measurement.setdefault(name, {"calls": 0, "wall_time_s": 0.0, "rss_before_mb": rss_before_mb,
+                                                                      "rss_after_mb": None, "peak_rss_increase_mb": 0.0})
+        measurement["calls"] += 1
+        measurement["wall_time_s"] = round(measurement["wall_time_s"] + wall_time, 6)
+        measurement["rss_after_mb"] = rss_after_mb
+        measurement["peak_rss_increase_mb"] = None if peak_rss_before_mb is None \
+            else round(measurement["peak_rss_increase_mb"] + peak_rss_after_mb - peak_rss_before_mb, 3)
+
+    def increment(self, name: str, value: float = 1):
+        self.counter_to_value[name] = self.counter_to_value.get(name, 0) + value
+
+    def add_series(self, name: str, values: [float]):
+        self.series_to_values.setdefault(name, []).extend(np.asarray(values).tolist())
+
+    @staticmethod
+    def get_memory_mb() -> (float, float):
+        return RunProfiler.get_current_rss_mb(), RunProfiler.get_peak_rss_mb()
+
+    # The resident pages from /proc, so only available on Linux.
+    @staticmethod
+    def get_current_rss_mb() -> float:
+        try:
+            with open("/proc/self/statm") as file:
+                resident_pages: int = int(file.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            return None
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 3)
+
+    @staticmethod
+    def get_peak_rss_mb() -> float:
+        if resource is None:
+            return None
+        # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+        scale: int = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 3)
+
+    @staticmethod
+    def get_children_peak_rss_mb() -> float:
+        if resource is None:
+            return None
+        scale: int = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+        return round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": self.stage_to_measurement,
+            "counters": self.counter_to_value,
+            "series": {name: {"count": len(values), "total": float(np.sum(values)), "mean": float(np.mean(values)),
+                              "max": float(np.max(values)), "values": values}
+                       for name, values in self.series_to_values.items() if values},
+            "peak_rss_mb": RunProfiler.get_peak_rss_mb(),
+            "children_peak_rss_mb": RunProfiler.get_children_peak_rss_mb(),
+        }
+
+    def save(self, output_path: str):
+        with open(output_path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+        print(f"Run profile saved: {output_path}")
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from efficient_frontier import EfficientFrontier
+from efficient_frontier_solver import EfficientFrontierSolver
+from historical_data import HistoricalData
+from model.portfolio_result import PortfolioResult
+from quandratic_solver import QuadraticSolver
+from risk_model.covariance_estimator import CovarianceEstimator
+from risk_model.risk_model import RiskModel
+from risk_model.sample_covariance_estimator import SampleCovarianceEstimator
+
+
+class WalkForwardBacktester:
+
+    def __init__(self, historical_data: HistoricalData, window_size: int, rebalance_days: int, frontier_points: int,
+                 risk_free_return: float, solver: QuadraticSolver, estimator: CovarianceEstimator = None):
+        self.historical_data: HistoricalData = historical_data
+        self.window_size: int = window_size
+        self.rebalance_days: int = rebalance_days
+        self.frontier_points: int = frontier_points
+        self.risk_free_return: float = risk_free_return
+        self.solver: QuadraticSolver = solver
+        self.estimator: CovarianceEstimator = estimator if estimator is not None else SampleCovarianceEstimator()
+
+    def run(self) -> DataFrame:
+        print("Running walk-forward backtest...", end=" ")
+        returns: DataFrame = self.historical_data.returns.dropna()
+        returns_array: np.array = returns.to_numpy(dtype=np.float64)
+        rows: [{}] = []
+        for window_end, statistics in self.historical_data.iterate_rolling_statistics(self.window_size, self.rebalance_days):
+            mean_returns: np.array = statistics.mean_returns_array
+            # The sample estimator takes the incrementally updated window statistics, the others estimate from the window returns.
+            H: RiskModel = self.estimator.estimate(returns.iloc[window_end - self.window_size:window_end], statistics)
+            frontier_solver: EfficientFrontierSolver = EfficientFrontierSolver(mean_returns, H, solver=self.solver)
+            frontier: EfficientFrontier = EfficientFrontier(frontier_solver, self.frontier_points, self.historical_data.symbols,
+                                                            self.risk_free_return)
+            min_std: PortfolioResult = frontier.get_min_std()
+            max_sharpe_ratio: PortfolioResult = frontier.get_max_sharpe_ratio()
+            out_of_sample_returns: np.array = returns_array[window_end:window_end + self.rebalance_days]
+            rows.append({
+                "Date": returns.index[window_end],
+                "Min Std Expected Return": min_std.annualized_expected_returns,
+                "Min Std Realized Return": out_of_sample_returns.dot(min_std.weights).sum(),
+                "Max Sharpe Ratio Expected Return": max_sharpe_ratio.annualized_expected_returns,
+                "Max Sharpe Ratio Realized Return": out_of_sample_returns.dot(max_sharpe_ratio.weights).sum(),
+                "Equal Weight Realized Return": out_of_sample_returns.mean(axis=1).sum(),
+            })
+        print("Done!")
+        return pd.DataFrame(rows).set_index("Date")
+
+    def summarize(self, backtest: DataFrame) -> DataFrame:
+        nr_of_trading_days = 252
+        periods_per_year: float = nr_of_trading_days / self.rebalance_days
+        realized_returns: DataFrame = backtest[[column for column in backtest.columns if column.endswith("Realized Return")]]
+        summary: DataFrame = pd.DataFrame({
+            "Annualized Return": realized_returns.mean() * periods_per_year,
+            "Annualized Standard Deviation": realized_returns.std() * np.sqrt(periods_per_year),
+        })
+        summary["Sharpe Ratio"] = (summary["Annualized Return"] - self.risk_free_return) / summary["Annualized Standard Deviation"]
+        summary.index = [column.replace(" Realized Return", "") for column in summary.index]
+        return summary
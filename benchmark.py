@@ -0,0 +1,143 @@
+import itertools
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+
+from data_source.synthetic_market_data_source import SyntheticMarketDataSource
+from efficient_frontier import EfficientFrontier
+from historical_data import HistoricalData
+from model.portfolio_result import PortfolioResult
+from model.portfolio_result_set import PortfolioResultSet
+from portfolio_analyser import PortfolioAnalyser
+from quandratic_solver import SlsqpBackend
+from report_options import ReportOptions
+
+stages: [str] = ["historical_data", "calculate_returns", "simulate_portfolio_result", "optimization_portfolio_result",
+                 "quadratic_solver_solve", "calculate_risk_metrics", "build_report"]
+# Pages drawing one annotated cell per pair of assets, which do not finish in reasonable time for large universes.
+per_asset_pair_report_pages: [str] = ["covariance", "correlation"]
+
+
+def main():
+    arg_parser = ArgumentParser(description='Offline benchmark of the portfolio analysis stages on synthetic market data.')
+    arg_parser.add_argument('--nr_of_assets', help='Asset counts to benchmark.', type=int, nargs='+', default=[10, 100])
+    arg_parser.add_argument('--history_days', help='Trading days of history to benchmark.', type=int, nargs='+', default=[756])
+    arg_parser.add_argument('--nr_of_simulations', help='Simulated portfolio counts to benchmark.', type=int, nargs='+', default=[50000])
+    arg_parser.add_argument('--frontier_points', help='Number of efficient frontier points to solve.', type=int, default=100)
+    arg_parser.add_argument('--stages', help='Stages to benchmark.', type=str, nargs='+', choices=stages, default=stages)
+    arg_parser.add_argument('--report_pages', help='Report pages rendered in the build_report stage.', type=str, nargs='+',
+                            choices=ReportOptions.report_pages)
+    arg_parser.add_argument('--max_assets_per_asset_pair_pages', help='Asset count above which the covariance and correlation pages are '
+                            'skipped unless given in --report_pages.', type=int, default=50)
+    arg_parser.add_argument('--no_memory', help='Skip the second pass that traces the peak memory of every stage.', action='store_true')
+    arg_parser.add_argument('--seed', help='Seed of the synthetic market data and the simulation.', type=int, default=0)
+    arg_parser.add_argument('--benchmark_output_path', help='Output path of the benchmark json.', type=str, default="benchmark.json")
+    args = arg_parser.parse_args()
+
+    results: [dict] = []
+    for nr_of_assets, history_days, nr_of_simulations in itertools.product(args.nr_of_assets, args.history_days, args.nr_of_simulations):
+        print(f"Benchmarking {nr_of_assets} assets, {history_days} days and {nr_of_simulations} simulations...")
+        parameters: dict = {"nr_of_assets": nr_of_assets, "history_days": history_days, "nr_of_simulations": nr_of_simulations,
+                            "frontier_points": args.frontier_points}
+        # Tracing allocations slows down python heavy stages several times, so wall time and peak memory are measured in separate passes.
+        stage_to_result: {str, dict} = run_benchmark(args, nr_of_assets, history_days, nr_of_simulations, trace_memory=False)
+        if not args.no_memory:
+            for stage, result in run_benchmark(args, nr_of_assets, history_days, nr_of_simulations, trace_memory=True).items():
+                stage_to_result[stage]["peak_memory_mb"] = result["peak_memory_mb"]
+        for stage, result in stage_to_result.items():
+            print(f"    {stage}: {result['wall_time_s']:.3f} s" + (f", {result['peak_memory_mb']:.1f} MB" if "peak_memory_mb" in result else ""))
+        results.append({"parameters": parameters, "stages": stage_to_result})
+
+    with open(args.benchmark_output_path, "w") as file:
+        json.dump({"commit": get_git_commit(), "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                   "results": results}, file, indent=2)
+    print(f"Benchmark saved: {args.benchmark_output_path}")
+
+
+def get_report_pages(args, nr_of_assets: int) -> [str]:
+    if args.report_pages is not None or nr_of_assets <= args.max_assets_per_asset_pair_pages:
+        return args.report_pages
+    return [page for page in ReportOptions.report_pages if page not in per_asset_pair_report_pages]
+
+
+def run_benchmark(args, nr_of_assets: int, history_days: int, nr_of_simulations: int, trace_memory: bool) -> {str, dict}:
+    symbols: [str] = [f"SYN{i:04d}" for i in range(nr_of_assets)]
+    end_date: pd.Timestamp = pd.Timestamp("2022-10-07")
+    start_date: pd.Timestamp = end_date - pd.offsets.BDay(history_days + 1)
+    data_source: SyntheticMarketDataSource = SyntheticMarketDataSource(seed=args.seed)
+    # The synthetic prices are generated before timing so the stages measure the analysis and not the data generation.
+    data_source.generate(symbols, str(start_date.date()), str(end_date.date()))
+
+    stage_to_result: {str, dict} = {}
+    if trace_memory:
+        tracemalloc.start()
+    historical_data: HistoricalData = measure(stage_to_result, "historical_data", args.stages, HistoricalData, symbols,
+                                              str(start_date.date()), str(end_date.date()), data_source)
+    if historical_data is None:
+        historical_data = HistoricalData(symbols, str(start_date.date()), str(end_date.date()), data_source)
+    measure(stage_to_result, "calculate_returns", args.stages, historical_data.calculate_returns)
+
+    with tempfile.TemporaryDirectory() as directory:
+        positions_file_path: str = os.path.join(directory, "positions.csv")
+        pd.DataFrame({"Symbol": symbols, "Quantity": np.arange(1, nr_of_assets + 1)}).to_csv(positions_file_path, index=False)
+        portfolio_analyser: PortfolioAnalyser = PortfolioAnalyser(historical_years=0, positions_file_path=positions_file_path,
+                                                                  risk_free_return=0, frontier_points=args.frontier_points,
+                                                                  report_pages=get_report_pages(args, nr_of_assets),
+                                                                  nr_of_simulations=nr_of_simulations,
+                                                                  plot_sample_size=min(nr_of_simulations, 50000), seed=args.seed,
+                                                                  historical_data=historical_data)
+        current_portfolio_result: PortfolioResult = portfolio_analyser.create_portfolio_result(portfolio_analyser.current_portfolio)
+        simulated_portfolio_results: PortfolioResultSet = measure(stage_to_result, "simulate_portfolio_result", args.stages,
+                                                                  portfolio_analyser.simulate_portfolio_result, current_portfolio_result)
+        optimization_portfolio_results: EfficientFrontier = measure(stage_to_result, "optimization_portfolio_result", args.stages,
+                                                                     portfolio_analyser.optimization_portfolio_result)
+        measure(stage_to_result, "quadratic_solver_solve", args.stages, SlsqpBackend().solve_frontier_point,
+                historical_data.risk_model, historical_data.mean_returns_array,
+                historical_data.mean_returns_array.mean(), np.full(nr_of_assets, 1 / nr_of_assets))
+        if simulated_portfolio_results is not None and optimization_portfolio_results is not None:
+            label_to_portfolio_result: {str, PortfolioResult} = portfolio_analyser.select_portfolio_results(
+                current_portfolio_result, simulated_portfolio_results, optimization_portfolio_results)
+            risk_metrics: {str, pd.DataFrame} = measure(stage_to_result, "calculate_risk_metrics", args.stages,
+                                                        portfolio_analyser.calculate_risk_metrics, label_to_portfolio_result,
+                                                        simulated_portfolio_results, optimization_portfolio_results)
+            measure(stage_to_result, "build_report", args.stages, portfolio_analyser.create_report_builder().build_report,
+                    os.path.join(directory, "report.pdf"), label_to_portfolio_result, simulated_portfolio_results,
+                    optimization_portfolio_results, risk_metrics)
+    if trace_memory:
+        tracemalloc.stop()
+    return stage_to_result
+
+
+def measure(stage_to_result: {str, dict}, stage: str, selected_stages: [str], function, *arguments):
+    if stage not in selected_stages:
+        return None
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        start_memory: int = tracemalloc.get_traced_memory()[0]
+        result = function(*arguments)
+        stage_to_result[stage] = {"peak_memory_mb": round((tracemalloc.get_traced_memory()[1] - start_memory) / 2 ** 20, 3)}
+    else:
+        start_time: float = time.perf_counter()
+        result = function(*arguments)
+        stage_to_result[stage] = {"wall_time_s": round(time.perf_counter() - start_time, 6)}
+    return result
+
+
+def get_git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
 
+from analysis_cache import AnalysisCache
+from batch_portfolio_analyser import BatchPortfolioAnalyser
+from data_source.cached_market_data_source import CachedMarketDataSource
+from data_source.local_file_market_data_source import LocalFileMarketDataSource
+from data_source.market_data_source import MarketDataSource
 from portfolio_analyser import PortfolioAnalyser
+from report_options import ReportOptions
+from risk_model.covariance_estimator import CovarianceEstimator
+from risk_model.ewma_covariance_estimator import EwmaCovarianceEstimator
+from risk_model.ledoit_wolf_estimator import LedoitWolfEstimator
+from risk_model.pca_factor_estimator import PcaFactorEstimator
+from risk_model.sample_covariance_estimator import SampleCovarianceEstimator
+from utils.run_profiler import RunProfiler
 from utils.utils import Utils
 
 
@@ -12,13 +24,167 @@ def main():
     arg_parser.add_argument('--r_free', help='Risk free return %', type=float, default=0)
     arg_parser.add_argument('--csv_path', help='Path to positions csv file.', type=str, default="positions.csv")
     arg_parser.add_argument('--report_output_path', help='Output path of the report.', type=str, default="analysis_report")
+    arg_parser.add_argument('--nr_of_simulations', help='Number of simulated portfolios.', type=positive_int, default=50000)
+    arg_parser.add_argument('--chunk_size', help='Number of portfolios simulated per chunk.', type=positive_int, default=10000)
+    arg_parser.add_argument('--plot_sample_size', help='Number of simulated portfolios kept for plotting.', type=positive_int, default=50000)
+    arg_parser.add_argument('--simulation_workers', help='Number of processes used to simulate portfolios.', type=int, default=1)
+    arg_parser.add_argument('--seed', help='Seed making the simulated portfolios reproducible.', type=int, default=None)
+    arg_parser.add_argument('--frontier_points', help='Number of efficient frontier points to solve.', type=positive_int, default=100)
+    arg_parser.add_argument('--frontier_workers', help='Number of processes used to solve the efficient frontier.', type=positive_int, default=1)
+    arg_parser.add_argument('--qp_backend', help='Quadratic solver backend.', type=str, choices=["active-set", "slsqp"], default="active-set")
+    arg_parser.add_argument('--check_qp_backends', help='Check that the solver backend agrees with the other backend.', action='store_true')
+    arg_parser.add_argument('--data_source', help='Market data source.', type=str, choices=["yahoo", "local"], default="yahoo")
+    arg_parser.add_argument('--data_directory', help='Directory of <SYMBOL>.csv files for the local data source.', type=str,
+                            default="market_data")
+    arg_parser.add_argument('--yahoo_base_url', help='Base url of the yahoo finance chart api the dividends are fetched from.', type=str,
+                            default="https://query1.finance.yahoo.com")
+    arg_parser.add_argument('--max_concurrent_requests', help='Max concurrent dividend requests to yahoo finance.', type=int, default=8)
+    arg_parser.add_argument('--cache_directory', help='Directory of the market data cache.', type=str, default=".market_data_cache")
+    arg_parser.add_argument('--no_cache', help='Do not cache market data on disk.', action='store_true')
+    arg_parser.add_argument('--analysis_cache_directory', help='Directory of the analysis cache reused when only quantities change.',
+                            type=str, default=".analysis_cache")
+    arg_parser.add_argument('--analysis_cache_size_mb', help='Size above which the least recently used analyses are evicted.',
+                            type=float, default=512)
+    arg_parser.add_argument('--no_analysis_cache', help='Do not cache the analysis on disk.', action='store_true')
+    arg_parser.add_argument('--report_workers', help='Number of processes used to render report pages.', type=int, default=1)
+    arg_parser.add_argument('--report_pages', help='Only render these report pages.', type=str, nargs='+',
+                            choices=ReportOptions.report_pages)
+    arg_parser.add_argument('--scatter_mode', help='Rendering of the simulated portfolios in the expected return vs std plot.', type=str,
+                            choices=ReportOptions.scatter_modes, default="raster")
+    arg_parser.add_argument('--max_plot_points', help='Max simulated portfolios to plot, sampled per std stratum.', type=int, default=None)
+    arg_parser.add_argument('--no_report', help='Write the selected portfolios and frontier points instead of the pdf report.',
+                            action='store_true')
+    arg_parser.add_argument('--output_format', help='Format of the results written with --no_report.', type=str,
+                            choices=ReportOptions.output_formats, default="json")
+    arg_parser.add_argument('--profile_output', help='Output path of a json run profile with stage timings, counters and peak RSS.',
+                            type=str, default=None)
+    arg_parser.add_argument('--cprofile_stage', help='Run this stage under cProfile, e.g. download, simulation, optimization or report.',
+                            type=str, default=None)
+    arg_parser.add_argument('--cprofile_output', help='Output path of the cProfile stats of --cprofile_stage.', type=str, default=None)
+    arg_parser.add_argument('--returns_storage', help='Keep the returns matrix in memory or in a memory-mapped file.', type=str,
+                            choices=["memory", "mmap"], default="memory")
+    arg_parser.add_argument('--returns_storage_directory', help='Directory of the memory-mapped returns, a temporary one by default.',
+                            type=str, default=None)
+    arg_parser.add_argument('--estimator', help='Covariance estimator of the risk model.', type=str,
+                            choices=["sample", "ledoit-wolf", "ewma", "pca"], default="sample")
+    arg_parser.add_argument('--ewma_decay', help='Daily decay of the ewma estimator weights.', type=float, default=0.94)
+    arg_parser.add_argument('--nr_of_factors', help='Number of principal components of the pca factor estimator.', type=int, default=5)
+    arg_parser.add_argument('--confidence_level', help='Confidence level of the value at risk and conditional value at risk.', type=float,
+                            default=0.95)
+    arg_parser.add_argument('--stress_scenarios', help='Csv of stress scenarios with the header Scenario,Symbol,Shock, shocks in percent.',
+                            type=str, default=None)
+    arg_parser.add_argument('--adjusted_close', help='Use total return adjusted closing prices instead of adjusting for dividends.',
+                            action='store_true')
+
+    subparsers = arg_parser.add_subparsers(dest='command')
+    backtest_parser = subparsers.add_parser('backtest', help='Walk-forward backtest of the min std and max sharpe ratio portfolios.')
+    backtest_parser.add_argument('--window_days', help='Trading days in each rolling estimation window.', type=int, default=252)
+    backtest_parser.add_argument('--rebalance_days', help='Trading days between rebalances.', type=int, default=21)
+    backtest_parser.add_argument('--backtest_output_path', help='Output path of the backtest csv.', type=str, default="walk_forward_backtest")
+    batch_parser = subparsers.add_parser('batch', help='Analyse many position files sharing one load of historical data.')
+    batch_parser.add_argument('--positions', help='Directory of positions csv files or a manifest listing one path per line.', type=str,
+                              required=True)
+    batch_parser.add_argument('--batch_output_directory', help='Output directory of the reports.', type=str, default="analysis_reports")
+    batch_parser.add_argument('--batch_workers', help='Number of processes building reports concurrently.', type=int, default=1)
+    serve_parser = subparsers.add_parser('serve', help='Serve analyses of posted positions over the symbols of --csv_path.')
+    serve_parser.add_argument('--host', help='Host the server listens on.', type=str, default="127.0.0.1")
+    serve_parser.add_argument('--port', help='Port the server listens on.', type=int, default=8050)
+    serve_parser.add_argument('--server_workers', help='Number of threads handling requests concurrently.', type=int, default=4)
+    serve_parser.add_argument('--refresh_minutes', help='Minutes between market data refreshes, never refreshed when 0.', type=float,
+                              default=60)
+    serve_parser.add_argument('--max_warm_analyses', help='Number of symbol sets whose analysis is kept in memory.', type=int, default=64)
     args = arg_parser.parse_args()
+    if args.command in ['batch', 'serve'] and (args.profile_output or args.cprofile_stage):
+        arg_parser.error(f"--profile_output and --cprofile_stage are not supported by {args.command}")
+
+    analyser_options: dict = dict(risk_free_return=args.r_free,
+                                  frontier_points=args.frontier_points,
+                                  frontier_workers=args.frontier_workers,
+                                  qp_backend=args.qp_backend,
+                                  check_qp_backends=args.check_qp_backends,
+                                  report_workers=args.report_workers,
+                                  report_pages=args.report_pages,
+                                  scatter_mode=args.scatter_mode,
+                                  max_plot_points=args.max_plot_points,
+                                  nr_of_simulations=args.nr_of_simulations,
+                                  chunk_size=args.chunk_size,
+                                  plot_sample_size=args.plot_sample_size,
+                                  simulation_workers=args.simulation_workers,
+                                  seed=args.seed,
+                                  confidence_level=args.confidence_level,
+                                  stress_scenarios_file_path=args.stress_scenarios)
+    date_range: str = f"from_{Utils.get_date_string_today_n_years_back(args.h_year)}_to_{Utils.get_date_string_yesterday()}"
+    output_format: str = args.output_format if args.no_report else "pdf"
+    if args.command == 'batch':
+        batch_portfolio_analyser: BatchPortfolioAnalyser = BatchPortfolioAnalyser(
+            historical_years=args.h_year,
+            positions_file_paths=BatchPortfolioAnalyser.get_positions_file_paths(args.positions),
+            data_source=create_market_data_source(args),
+            use_adjusted_close=args.adjusted_close,
+            nr_of_workers=args.batch_workers,
+            analyser_options=analyser_options,
+            returns_storage=args.returns_storage,
+            returns_storage_directory=args.returns_storage_directory,
+            estimator=create_covariance_estimator(args))
+        batch_portfolio_analyser.create_analysis_reports(args.batch_output_directory, date_range, output_format)
+        return
+    if args.command == 'serve':
+        from analysis_server import AnalysisServer
+        analysis_server: AnalysisServer = AnalysisServer(symbols=PortfolioAnalyser.get_symbols_from_csv(args.csv_path),
+                                                         historical_years=args.h_year,
+                                                         data_source=create_market_data_source(args),
+                                                         use_adjusted_close=args.adjusted_close,
+                                                         estimator=create_covariance_estimator(args),
+                                                         analyser_options=analyser_options,
+                                                         nr_of_workers=args.server_workers,
+                                                         refresh_interval_seconds=args.refresh_minutes * 60,
+                                                         max_warm_analyses=args.max_warm_analyses)
+        analysis_server.serve(args.host, args.port)
+        return
 
     portfolio_analyser: PortfolioAnalyser = PortfolioAnalyser(historical_years=args.h_year,
                                                               positions_file_path=args.csv_path,
-                                                              risk_free_return=args.r_free)
-    portfolio_analyser.create_analysis_report(
-        f"{args.report_output_path}_from_{Utils.get_date_string_today_n_years_back(args.h_year)}_to_{Utils.get_date_string_yesterday()}.pdf")
+                                                              data_source=create_market_data_source(args),
+                                                              use_adjusted_close=args.adjusted_close,
+                                                              profiler=RunProfiler(args.cprofile_stage, args.cprofile_output),
+                                                              returns_storage=args.returns_storage,
+                                                              returns_storage_directory=args.returns_storage_directory,
+                                                              estimator=create_covariance_estimator(args),
+                                                              analysis_cache=None if args.no_analysis_cache else AnalysisCache(
+                                                                  args.analysis_cache_directory, args.analysis_cache_size_mb),
+                                                              **analyser_options)
+    if args.command == 'backtest':
+        portfolio_analyser.run_walk_forward_backtest(args.window_days, args.rebalance_days, f"{args.backtest_output_path}_{date_range}.csv")
+    else:
+        portfolio_analyser.create_analysis_report(f"{args.report_output_path}_{date_range}.{output_format}", output_format)
+    if args.profile_output:
+        portfolio_analyser.profiler.save(args.profile_output)
+
+
+def positive_int(value: str) -> int:
+    number: int = int(value)
+    if number <= 0:
+        raise ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def create_market_data_source(args) -> MarketDataSource:
+    if args.data_source == "local":
+        data_source: MarketDataSource = LocalFileMarketDataSource(args.data_directory)
+    else:
+        from data_source.yahoo_market_data_source import YahooMarketDataSource
+        data_source: MarketDataSource = YahooMarketDataSource(args.yahoo_base_url, args.max_concurrent_requests)
+    return data_source if args.no_cache else CachedMarketDataSource(data_source, args.cache_directory)
+
+
+def create_covariance_estimator(args) -> CovarianceEstimator:
+    if args.estimator == "ledoit-wolf":
+        return LedoitWolfEstimator()
+    if args.estimator == "ewma":
+        return EwmaCovarianceEstimator(args.ewma_decay)
+    if args.estimator == "pca":
+        return PcaFactorEstimator(args.nr_of_factors)
+    return SampleCovarianceEstimator()
 
 
 if __name__ == "__main__":